@@ -1,18 +1,119 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Any
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from backend.filter import RelevanceFilter
-from backend.matcher import find_violations
-from backend.inference import run_inference
-import json
+from backend.matcher import find_violations, find_violations_batch, get_embedding_cache, retrieval_version, rule_index_version
+from backend.models import registry
+from backend.inference import create_async_client, count_summary, run_inference_async, run_inference_batch_async, stream_inference, verdict_cache, MODEL, PROMPT_VERSION
+from backend.cache import ANALYSIS_STORE_PATH, AnalysisStore, MemoCache, document_hash
+from backend.incremental import describe_changes, merge_records, new_record, plan_version
+from backend.jobs import JOB_STORE_PATH, JobQueue, JobStore, QueueFull
+from backend.singleflight import SingleFlight
+from backend.telemetry import current_trace, render_metrics, stage, start_trace
+import hashlib, logging
+import asyncio, contextvars, json, os
 
-app = FastAPI(title="AttorneysInRAGs API")
+logger = logging.getLogger(__name__)
+
+# CPU-bound stages (spaCy, classifier, embeddings) run on this many threads so the
+# event loop stays free for requests that are only waiting on Ollama.
+CPU_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load + warm every model in the background; /readyz reports when it is done
+    registry.start_warmup()
+    app.state.ollama_client = create_async_client()
+    app.state.cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu-stage")
+    app.state.jobs = JobQueue(job_store, lambda payload, progress: run_analysis_job(app, payload, progress))
+    app.state.jobs.start()
+    try:
+        yield
+    finally:
+        await app.state.jobs.stop()
+        await app.state.ollama_client.aclose()
+        app.state.cpu_executor.shutdown(wait=False)
+
+app = FastAPI(title="AttorneysInRAGs API", lifespan=lifespan)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Give every request a trace (X-Trace-Id, or continue the caller's) and report its stage timings."""
+    trace = start_trace(request.headers.get("x-trace-id"))
+    response = await call_next(request)
+    response.headers["X-Trace-Id"] = trace.trace_id
+    if trace.stages:
+        response.headers["Server-Timing"] = trace.server_timing()
+    return response
 
 legal_filter = RelevanceFilter()
 
+# Finished /analyze responses by ETag. The ETag hashes the document together with
+# everything that can change the answer, so a new rule index or model simply
+# produces new keys and the old entries age out of the LRU.
+RESPONSE_CACHE_SIZE = 1024
+response_cache = MemoCache("responses", "etag", max_entries=RESPONSE_CACHE_SIZE, sizeof=lambda v: len(json.dumps(v)))
+
+# Previous version of each document analysed through /analyze/incremental
+analysis_store = AnalysisStore(ANALYSIS_STORE_PATH)
+
+# Status and results of /jobs analyses
+job_store = JobStore(JOB_STORE_PATH)
+
+# Identical documents arriving while one is being analysed wait for that run (by ETag)
+document_flight = SingleFlight("document")
+
+def pipeline_version() -> str:
+    # Reads the Gate 2 and embedder versions and the retriever setup, which loads
+    # those models and the index (or waits on the registry during warm-up): call
+    # it through run_cpu, never on the loop.
+    return "|".join([
+        rule_index_version(),
+        retrieval_version(),
+        legal_filter.segmenter,
+        legal_filter.classifier_cache.version,
+        get_embedding_cache().version,
+        MODEL,
+        PROMPT_VERSION,
+    ])
+
+def document_etags(texts: list[str]) -> list[str]:
+    """ETags of several documents (blocking, see pipeline_version)."""
+    version = pipeline_version()
+    return [f'"{hashlib.sha256(f"{version}|{document_hash(text)}".encode("utf-8")).hexdigest()[:32]}"' for text in texts]
+
+def document_etag(text: str) -> str:
+    return document_etags([text])[0]
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # "*" is deliberately not honoured: it would answer 304 for documents never analysed
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+async def run_cpu_in(app: FastAPI, fn, *args):
+    """Run a blocking pipeline stage on the bounded CPU executor (in the caller's trace context)."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(app.state.cpu_executor, ctx.run, fn, *args)
+
+async def run_cpu(request: Request, fn, *args):
+    return await run_cpu_in(request.app, fn, *args)
+
 class TextInput(BaseModel):
     text: str
 
+class BatchInput(BaseModel):
+    documents: list[TextInput]
+
+class VersionInput(BaseModel):
+    document_id: str                     # URL or any stable id the client uses for this policy
+    text: str
+
 class Violation(BaseModel):
     violating_rule: str
     actual_rule: str
@@ -32,63 +133,121 @@ class AnalysisOutput(BaseModel):
     aggregations: Aggregations
     violations: list[Violation]
 
+class BatchItem(BaseModel):
+    status: int                          # what /analyze would have answered for this document
+    etag: str | None = None
+    detail: str | None = None            # error message when status != 200
+    result: AnalysisOutput | None = None
+
+class BatchOutput(BaseModel):
+    results: list[BatchItem]             # same order as the submitted documents
+
+class Changes(BaseModel):
+    previous_version: bool               # false on the first analysis of this document_id
+    unchanged: int
+    added: list[str]
+    modified: list[dict[str, str]]       # {"before": ..., "after": ...}
+    removed: list[str]
+    reanalyzed_sentences: int
+    new_violations: list[dict[str, Any]]
+    resolved_violations: list[dict[str, Any]]
+
+class IncrementalOutput(AnalysisOutput):
+    changes: Changes
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str                          # "queued"
+    position: int                        # jobs waiting in this worker's queue, this one included
+
+class JobError(BaseModel):
+    status_code: int                     # what /analyze would have answered
+    detail: str
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str                          # queued | running | done | failed
+    progress: dict[str, Any]             # current stage, plus the stage timings so far
+    result: AnalysisOutput | None = None
+    error: JobError | None = None
+
+# Documents accepted by one /analyze/batch call
+MAX_BATCH_DOCUMENTS = 256
+
+def join_violation(item: dict, accepted_matches: list[dict]) -> dict | None:
+    """Join one LLM analysis item with its match; None unless it is a real violation."""
+    idx = item.get("id", 1) - 1
+    if item.get("violated") and not item.get("irrelevant"):
+        if 0 <= idx < len(accepted_matches):
+            match = accepted_matches[idx]
+            sev = match.get("severity", "MEDIUM").upper()
+            return {
+                "violating_rule": match.get("TOS_text", ""),
+                "actual_rule": match.get("raw_law", ""),
+                "source": f"[{match.get('rule_id', 'Unknown')}] {', '.join(match.get('domain', []))}",
+                "severity": sev,
+                "reason": item.get("reason", ""),
+            }
+    return None
+
+def aggregate(violations: list[dict]) -> dict:
+    severity_counts = {"CRITICAL": 0, "HIGH": 0, "MEDIUM": 0, "LOW": 0}
+    for v in violations:
+        severity_counts[v["severity"]] = severity_counts.get(v["severity"], 0) + 1
+    
+    return {
+        "total_violations": len(violations),
+        "critical_severity": severity_counts.get("CRITICAL", 0),
+        "high_severity": severity_counts.get("HIGH", 0),
+        "medium_severity": severity_counts.get("MEDIUM", 0),
+        "low_severity": severity_counts.get("LOW", 0),
+    }
+
 def build_response(accepted_matches: list[dict], inference_result: dict) -> dict:
     analysis = inference_result.get("analysis", [])
     summary = inference_result.get("summary", "Analysis complete.")
     
-    print(f"\n{'='*60}")
-    print(f"BUILD RESPONSE DEBUG")
-    print(f"{'='*60}")
-    print(f"Total matches from vector DB: {len(accepted_matches)}")
-    print(f"Total analysis items from LLM: {len(analysis)}")
-    print(f"\nLLM Analysis:")
-    for item in analysis:
-        print(f"  id={item.get('id')} | violated={item.get('violated')} | irrelevant={item.get('irrelevant')} | reason={item.get('reason', '')[:80]}")
-    print(f"{'='*60}\n")
+    logger.debug("Building response: %d matches from vector DB, %d analysis items from LLM", len(accepted_matches), len(analysis))
+    if logger.isEnabledFor(logging.DEBUG):
+        for item in analysis:
+            logger.debug("  id=%s | violated=%s | irrelevant=%s | reason=%s", item.get('id'), item.get('violated'),
+                         item.get('irrelevant'), str(item.get('reason', ''))[:80])
     
     violations = []
-    severity_counts = {"CRITICAL": 0, "HIGH": 0, "MEDIUM": 0, "LOW": 0}
     
     for item in analysis:
-        idx = item.get("id", 1) - 1
-        if item.get("violated") and not item.get("irrelevant"):
-            if 0 <= idx < len(accepted_matches):
-                match = accepted_matches[idx]
-                sev = match.get("severity", "MEDIUM").upper()
-                severity_counts[sev] = severity_counts.get(sev, 0) + 1
-                
-                print(f"[VIOLATION FOUND] id={item.get('id')} | severity={sev} | rule_id={match.get('rule_id')}")
-                
-                violations.append({
-                    "violating_rule": match.get("TOS_text", ""),
-                    "actual_rule": match.get("raw_law", ""),
-                    "source": f"[{match.get('rule_id', 'Unknown')}] {', '.join(match.get('domain', []))}",
-                    "severity": sev,
-                    "reason": item.get("reason", ""),
-                })
-    
-    total = len(violations)
-    print(f"\nFinal: {total} violations out of {len(analysis)} analyzed")
+        violation = join_violation(item, accepted_matches)
+        if violation:
+            logger.debug("Violation found: id=%s | severity=%s | source=%s", item.get('id'), violation['severity'], violation['source'])
+            violations.append(violation)
+    
+    logger.debug("%d violations out of %d analyzed", len(violations), len(analysis))
     
     return {
         "summary": summary,
-        "aggregations": {
-            "total_violations": total,
-            "critical_severity": severity_counts.get("CRITICAL", 0),
-            "high_severity": severity_counts.get("HIGH", 0),
-            "medium_severity": severity_counts.get("MEDIUM", 0),
-            "low_severity": severity_counts.get("LOW", 0),
-        },
+        "aggregations": aggregate(violations),
         "violations": violations,
     }
 
-@app.post("/analyze", response_model=AnalysisOutput)
-def analyze_text(input_data: TextInput):
+EMPTY_OUTPUT = AnalysisOutput(
+    summary="No potential violations found.",
+    aggregations=Aggregations(
+        total_violations=0,
+        critical_severity=0,
+        high_severity=0,
+        medium_severity=0,
+        low_severity=0,
+    ),
+    violations=[],
+)
+
+async def prepare_matches(input_data: TextInput, app: FastAPI) -> list[dict]:
+    """Filter + match stages shared by /analyze, /analyze/stream and /jobs."""
     if not input_data.text.strip():
         raise HTTPException(status_code=400, detail="Text cannot be empty")
     
     try:
-        clean_chunks = legal_filter.process_document(input_data.text)
+        clean_chunks = await run_cpu_in(app, legal_filter.process_document, input_data.text)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Document processing failed: {str(e)}")
     
@@ -96,32 +255,285 @@ def analyze_text(input_data: TextInput):
         raise HTTPException(status_code=422, detail="No valid legal clauses found")
     
     try:
-        accepted_matches = find_violations(clean_chunks)
+        return await run_cpu_in(app, find_violations, clean_chunks)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Violation detection failed: {str(e)}")
+
+async def analyze_document(input_data: TextInput, app: FastAPI, etag: str, progress=None) -> dict:
+    """
+    The /analyze pipeline behind the response cache. Raises HTTPException with
+    the status /analyze answers; progress(stage, **details), if given, is told
+    as each stage starts. Concurrent calls for the same document share one run.
+    """
+    report = progress or (lambda stage, **details: None)
+    cached = response_cache.get_many([etag]).get(etag)
+    if cached is not None:
+        return cached
+    
+    if etag in document_flight:
+        report("waiting_for_identical_analysis")
+    return await document_flight.do(etag, lambda: _analyze_uncached(input_data, app, etag, report))
+
+async def _analyze_uncached(input_data: TextInput, app: FastAPI, etag: str, report) -> dict:
+    report("filter_and_match")
+    accepted_matches = await prepare_matches(input_data, app)
     
     if not accepted_matches:
-        return AnalysisOutput(
-            summary="No potential violations found.",
-            aggregations=Aggregations(
-                total_violations=0,
-                critical_severity=0,
-                high_severity=0,
-                medium_severity=0,
-                low_severity=0,
-            ),
-            violations=[],
-        )
-    
-    inference_result = run_inference(accepted_matches)
+        result = EMPTY_OUTPUT.model_dump()
+        response_cache.put_many({etag: result})
+        return result
+    
+    report("inference", pairs=len(accepted_matches))
+    inference_result = await run_inference_async(accepted_matches, app.state.ollama_client)
     
     if "error" in inference_result:
         raise HTTPException(status_code=503, detail=f"LLM inference failed: {inference_result.get('error')}")
     
+    report("build_response")
     try:
-        return build_response(accepted_matches, inference_result)
+        with stage("build_response"):
+            result = build_response(accepted_matches, inference_result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Response building failed: {str(e)}")
+    
+    # Partial results (some shards failed) are returned but not cached
+    if "shard_errors" not in inference_result:
+        response_cache.put_many({etag: result})
+    return result
+
+async def run_analysis_job(app: FastAPI, payload: dict, progress) -> dict:
+    input_data = TextInput(text=payload["text"])
+    etag = await run_cpu_in(app, document_etag, input_data.text)
+    return await analyze_document(input_data, app, etag, progress)
+
+@app.post("/analyze", response_model=AnalysisOutput)
+async def analyze_text(input_data: TextInput, request: Request, response: Response):
+    etag = await run_cpu(request, document_etag, input_data.text)
+    # The ETag is derived from the input, but it only stands for an answer the
+    # response cache holds: a matching If-None-Match then means the client
+    # already has that analysis. Partial results (not cached) carry no ETag, so
+    # a client is never pinned to a degraded answer.
+    if etag in response_cache and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    result = await analyze_document(input_data, request.app, etag)
+    if etag in response_cache:
+        response.headers["ETag"] = etag
+    return result
+
+@app.post("/jobs", response_model=JobAccepted, status_code=202)
+async def submit_job(input_data: TextInput, request: Request, response: Response):
+    """
+    Queue an /analyze run and return its job id at once; poll GET /jobs/{id}.
+    Answers 429 with Retry-After while this worker's queue is full.
+    """
+    if not input_data.text.strip():
+        raise HTTPException(status_code=400, detail="Text cannot be empty")
+    try:
+        accepted = await request.app.state.jobs.submit({"text": input_data.text})
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    response.headers["Location"] = f"/jobs/{accepted['job_id']}"
+    return accepted
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: str):
+    """Status, progress and, once done, the AnalysisOutput (or the error /analyze would have returned)."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+@app.post("/analyze/batch", response_model=BatchOutput)
+async def analyze_batch(input_data: BatchInput, request: Request):
+    """
+    /analyze for many documents in one call. Documents already in the response
+    cache are answered from it; the rest are segmented together, Gate 2 and the
+    embedder run over their pooled sentences, retrieval is one vectorized pass,
+    and the LLM judges their deduplicated pairs in packed prompts. Each document
+    gets its own status and AnalysisOutput, in the order submitted.
+    """
+    documents = input_data.documents
+    if not documents:
+        raise HTTPException(status_code=400, detail="No documents given")
+    if len(documents) > MAX_BATCH_DOCUMENTS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_DOCUMENTS} documents per batch")
+    
+    etags = await run_cpu(request, document_etags, [doc.text for doc in documents])
+    cached = response_cache.get_many(list(set(etags)))
+    outcomes: dict[str, dict] = {}
+    for doc, etag in zip(documents, etags):
+        if etag in outcomes:
+            continue  # same document twice in the batch: analysed once
+        if not doc.text.strip():
+            outcomes[etag] = {"status": 400, "detail": "Text cannot be empty"}
+        elif etag in cached:
+            outcomes[etag] = {"status": 200, "result": cached[etag]}
+    
+    todo = list(dict.fromkeys(etag for etag in etags if etag not in outcomes))
+    texts = {etag: doc.text for doc, etag in zip(documents, etags)}
+    if todo:
+        try:
+            chunk_lists = await run_cpu(request, legal_filter.process_documents, [texts[etag] for etag in todo])
+            match_lists = await run_cpu(request, find_violations_batch, chunk_lists)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Batch processing failed: {str(e)}")
+        
+        judged = [j for j, matches in enumerate(match_lists) if matches]
+        inference_results = await run_inference_batch_async([match_lists[j] for j in judged], request.app.state.ollama_client)
+        inference_by_doc = dict(zip(judged, inference_results))
+        
+        fresh = {}
+        for j, etag in enumerate(todo):
+            if not chunk_lists[j]:
+                outcomes[etag] = {"status": 422, "detail": "No valid legal clauses found"}
+                continue
+            if not match_lists[j]:
+                outcomes[etag] = {"status": 200, "result": EMPTY_OUTPUT.model_dump()}
+                fresh[etag] = outcomes[etag]["result"]
+                continue
+            
+            inference_result = inference_by_doc[j]
+            if "error" in inference_result:
+                outcomes[etag] = {"status": 503, "detail": f"LLM inference failed: {inference_result['error']}"}
+                continue
+            try:
+                with stage("build_response"):
+                    result = build_response(match_lists[j], inference_result)
+            except Exception as e:
+                outcomes[etag] = {"status": 500, "detail": f"Response building failed: {str(e)}"}
+                continue
+            outcomes[etag] = {"status": 200, "result": result}
+            if "shard_errors" not in inference_result:
+                fresh[etag] = result
+        response_cache.put_many(fresh)
+    
+    # As for /analyze, only results the response cache holds get an ETag
+    return {"results": [{"etag": etag if etag in response_cache else None, **outcomes[etag]} for etag in etags]}
+
+@app.post("/analyze/incremental", response_model=IncrementalOutput)
+async def analyze_incremental(input_data: VersionInput, request: Request):
+    """
+    /analyze for a new version of a known document. Sentences unchanged since
+    the version last analysed under this document_id keep their matches and
+    verdicts; only added or edited ones go through Gate 2, retrieval and the
+    LLM. Returns the merged report for the whole version plus "changes".
+    """
+    if not input_data.text.strip():
+        raise HTTPException(status_code=400, detail="Text cannot be empty")
+    
+    version = await run_cpu(request, pipeline_version)
+    previous = await run_cpu(request, analysis_store.get, input_data.document_id, version)
+    
+    try:
+        sents = (await run_cpu(request, legal_filter.segment_documents, [input_data.text]))[0]
+        texts = [sent.text.strip() for sent in sents]
+        records, changed = plan_version(texts, previous)
+        # One list per changed sentence, so chunks and matches map back to it
+        chunk_lists = await run_cpu(request, legal_filter.gate_sentences, [[sents[i]] for i in changed])
+        match_lists = await run_cpu(request, find_violations_batch, chunk_lists)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Document processing failed: {str(e)}")
+    
+    judged = [k for k, matches in enumerate(match_lists) if matches]
+    inference_results = await run_inference_batch_async([match_lists[k] for k in judged], request.app.state.ollama_client)
+    errors = [result["error"] for result in inference_results if "error" in result]
+    if errors:
+        raise HTTPException(status_code=503, detail=f"LLM inference failed: {errors[0]}")
+    inference_by_sentence = dict(zip(judged, inference_results))
+    
+    for k, i in enumerate(changed):
+        items = {item["id"]: item for item in inference_by_sentence.get(k, {}).get("analysis", [])}
+        verdicts = []
+        for n in range(len(match_lists[k])):
+            item = items.get(n + 1)
+            verdicts.append({key: value for key, value in item.items() if key != "id"} if item else None)
+        records[i] = new_record(texts[i], match_lists[k], verdicts)
+    
+    # Stored even if some shards failed: sentences without a verdict are re-analysed next time
+    await run_cpu(request, analysis_store.put, input_data.document_id, version, {"sentences": records})
+    changes = describe_changes(previous, records, len(changed))
+    
+    accepted_matches, analysis = merge_records(records)
+    if not accepted_matches:
+        return {**EMPTY_OUTPUT.model_dump(), "changes": changes}
+    try:
+        with stage("build_response"):
+            result = build_response(accepted_matches, {"analysis": analysis, "summary": count_summary(analysis)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Response building failed: {str(e)}")
+    return {**result, "changes": changes}
+
+def sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/analyze/stream")
+async def analyze_stream(input_data: TextInput, request: Request):
+    """
+    Server-Sent Events version of /analyze. Emits one "analysis" event per LLM
+    item as soon as it is generated (with "violation" joined from its match, or
+    null), then a final "summary" event with summary + aggregations, or an
+    "error" event if inference fails.
+    """
+    accepted_matches = await prepare_matches(input_data, request.app)
+    
+    async def events():
+        if not accepted_matches:
+            yield sse("summary", {"summary": EMPTY_OUTPUT.summary, "aggregations": EMPTY_OUTPUT.aggregations.model_dump()})
+            return
+        
+        violations = []
+        async for event in stream_inference(accepted_matches, request.app.state.ollama_client):
+            if event["type"] == "item":
+                item = event["item"]
+                try:
+                    violation = join_violation(item, accepted_matches)
+                except Exception:
+                    violation = None
+                if violation:
+                    violations.append(violation)
+                yield sse("analysis", {**item, "violation": violation})
+            elif event["type"] == "result":
+                trace = current_trace()
+                yield sse("summary", {"summary": event["summary"], "aggregations": aggregate(violations),
+                                      "trace": trace.as_dict() if trace else None})
+            else:
+                yield sse("error", {"detail": f"LLM inference failed: {event['error']}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: every model is loaded and has run a warm-up batch."""
+    ready = registry.ready()
+    body = {"ready": ready, "models": registry.status()}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus exposition: stage latencies, gate counts, LLM tokens/retries, parse strategies, errors."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {
+        "verdicts": verdict_cache.stats(),
+        "gate2": legal_filter.classifier_cache.stats(),
+        "embeddings": get_embedding_cache().stats(),
+        "responses": response_cache.stats(),
+        "documents": analysis_store.stats(),
+        "jobs": job_store.stats(),
+    }
 
 if __name__ == "__main__":
     import uvicorn
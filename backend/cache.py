@@ -0,0 +1,381 @@
+import hashlib, json, os, re, sqlite3, sys, threading, time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different copies share a key."""
+    return re.sub(r"\s+", " ", text or "").strip().lower()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def exact_hash(text: str) -> str:
+    """Hash of the text exactly as given, for memos of models that see its casing."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def document_hash(text: str) -> str:
+    """Hash of a whole document; whitespace-insensitive but, unlike text_hash, case-preserving."""
+    return hashlib.sha256(re.sub(r"\s+", " ", text or "").strip().encode("utf-8")).hexdigest()
+
+
+# Default disk tier for MemoCache (Gate 2 scores, embeddings)
+MEMO_DISK_PATH = Path(__file__).resolve().parent / "database" / "memo_cache.sqlite3"
+
+# Previous versions of documents analysed incrementally (AnalysisStore)
+ANALYSIS_STORE_PATH = Path(__file__).resolve().parent / "database" / "analysis_store.sqlite3"
+
+
+class VerdictCache:
+    """
+    Disk-backed (SQLite) cache of LLM verdicts for (ToS sentence, rule) pairs.
+
+    Keys combine the normalized sentence hash, rule_id, model name and prompt
+    version, so changing either of the last two naturally misses. Entries
+    older than ttl seconds are dropped, and the least recently used are
+    evicted once the table holds more than max_entries rows.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 100_000, ttl: float = 30 * 24 * 3600):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect()
+        # A SQLite connection must not cross fork(): pre-forked workers reopen it
+        os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self) -> None:
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS verdicts (
+                key TEXT PRIMARY KEY,
+                violated INTEGER NOT NULL,
+                irrelevant INTEGER NOT NULL,
+                reason TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS verdicts_last_used ON verdicts(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(tos_text: str, rule_id: str, model: str, prompt_version: str) -> str:
+        return hashlib.sha256(f"{text_hash(tos_text)}|{rule_id}|{model}|{prompt_version}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return {key: {"violated", "irrelevant", "reason"}} for the keys that are cached."""
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), 500):  # stay under SQLite's variable limit
+                chunk = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, violated, irrelevant, reason FROM verdicts "
+                    f"WHERE key IN ({','.join('?' * len(chunk))}) AND created >= ?",
+                    (*chunk, now - self.ttl),
+                ).fetchall()
+                for key, violated, irrelevant, reason in rows:
+                    found[key] = {"violated": bool(violated), "irrelevant": bool(irrelevant), "reason": reason}
+            if found:
+                self._conn.executemany("UPDATE verdicts SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+            hit_count = sum(1 for k in keys if k in found)
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+        return found
+
+    def put_many(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO verdicts (key, violated, irrelevant, reason, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (key, int(bool(v.get("violated"))), int(bool(v.get("irrelevant"))), str(v.get("reason", "")), now, now)
+                    for key, v in entries.items()
+                ],
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM verdicts WHERE created < ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM verdicts")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class AnalysisStore:
+    """
+    Last analysed version of each document, keyed by its identity (URL or a
+    client-supplied id), for incremental re-analysis. A version is stored as a
+    JSON record of its sentences with their matches and verdicts, together
+    with the pipeline version that produced it; get() ignores records from any
+    other pipeline version. Beyond max_documents the least recently updated
+    documents are dropped.
+    """
+
+    def __init__(self, path: Path, max_documents: int = 10_000):
+        self.path = Path(path)
+        self.max_documents = max_documents
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect()
+        os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self) -> None:
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS documents (
+                document_id TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                record TEXT NOT NULL,
+                updated REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_updated ON documents(updated)")
+        self._conn.commit()
+
+    def get(self, document_id: str, version: str) -> Dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM documents WHERE document_id = ? AND version = ?", (document_id, version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, document_id: str, version: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (document_id, version, record, updated) VALUES (?, ?, ?, ?)",
+                (document_id, version, json.dumps(record), time.time()),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()
+            if count > self.max_documents:
+                self._conn.execute(
+                    "DELETE FROM documents WHERE document_id IN "
+                    "(SELECT document_id FROM documents ORDER BY updated ASC LIMIT ?)",
+                    (count - self.max_documents,),
+                )
+            self._conn.commit()
+
+    def delete(self, document_id: str) -> bool:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM documents WHERE document_id = ?", (document_id,)).rowcount
+            self._conn.commit()
+        return deleted > 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "documents": count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def model_version(name: str, model: Any = None) -> str:
+    """
+    Identify a loaded model as "name@commit" (HF hub revision when known), so
+    caches built on its outputs are invalidated when the weights change.
+    """
+    config = getattr(model, "config", None) or getattr(getattr(model, "model", None), "config", None)
+    if config is None and model is not None:
+        try:
+            config = model[0].auto_model.config  # SentenceTransformer
+        except Exception:
+            config = None
+    commit = getattr(config, "_commit_hash", None)
+    version = f"{name}@{commit or 'unknown'}"
+    # ONNX outputs differ slightly from torch (and int8 more so): cache them apart
+    backend = getattr(model, "inference_backend", None)
+    if backend and backend.startswith("onnx"):
+        version += f"+{backend}"
+    return version
+
+
+_MISSING = object()
+
+
+class MemoCache:
+    """
+    Bounded in-process LRU for per-sentence model outputs, with an optional
+    SQLite disk tier shared across restarts and workers.
+
+    Entries are scoped by (name, version): opening the cache with a new model
+    version deletes the disk rows written by the previous one. encode/decode
+    turn values into BLOBs for the disk tier; sizeof estimates the RAM a
+    value holds for stats().
+    """
+
+    def __init__(self, name: str, version: str, max_entries: int = 50_000, disk_path: Path | None = None,
+                 disk_max_entries: int = 500_000, encode=None, decode=None, sizeof=None):
+        self.name = name
+        self.version = version
+        self.max_entries = max(1, int(max_entries))
+        self.disk_max_entries = disk_max_entries
+        self.encode = encode
+        self.decode = decode
+        self.sizeof = sizeof or sys.getsizeof
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        self.disk_path = disk_path
+        if disk_path is not None:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._connect()
+            # A SQLite connection must not cross fork(): pre-forked workers reopen it
+            os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self) -> None:
+        if self.disk_path is not None:
+            self._conn = sqlite3.connect(str(self.disk_path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS memo (
+                    name TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    PRIMARY KEY (name, version, key)
+                )"""
+            )
+            # Model swapped since these rows were written: they are stale
+            self._conn.execute("DELETE FROM memo WHERE name = ? AND version != ?", (self.name, self.version))
+            self._conn.commit()
+
+    def _remember(self, key: str, value: Any) -> None:
+        if key in self._entries:
+            self.bytes -= self.sizeof(self._entries.pop(key))
+        self._entries[key] = value
+        self.bytes += self.sizeof(value)
+        while len(self._entries) > self.max_entries:
+            _, old = self._entries.popitem(last=False)
+            self.bytes -= self.sizeof(old)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        found = {}
+        with self._lock:
+            pending = []
+            for key in keys:
+                value = self._entries.get(key, _MISSING)
+                if value is _MISSING:
+                    pending.append(key)
+                else:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+                    self.hits += 1
+
+            if pending and self._conn is not None:
+                unique = list(dict.fromkeys(pending))
+                for start in range(0, len(unique), 500):
+                    chunk = unique[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT key, value FROM memo WHERE name = ? AND version = ? AND key IN ({','.join('?' * len(chunk))})",
+                        (self.name, self.version, *chunk),
+                    ).fetchall()
+                    for key, blob in rows:
+                        value = self.decode(blob) if self.decode else blob
+                        self._remember(key, value)
+                        found[key] = value
+                disk_found = sum(1 for key in pending if key in found)
+                self.disk_hits += disk_found
+                self.hits += disk_found
+                self.misses += len(pending) - disk_found
+            else:
+                self.misses += len(pending)
+        return found
+
+    def __contains__(self, key: str) -> bool:
+        """Whether key is in the memory tier; unlike get_many, no LRU or hit-count side effects."""
+        with self._lock:
+            return key in self._entries
+
+    def put_many(self, entries: Dict[str, Any]) -> None:
+        if not entries:
+            return
+        with self._lock:
+            for key, value in entries.items():
+                self._remember(key, value)
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO memo (name, version, key, value) VALUES (?, ?, ?, ?)",
+                    [(self.name, self.version, key, self.encode(v) if self.encode else v) for key, v in entries.items()],
+                )
+                # Oldest writes go first once the disk tier is full
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM memo WHERE name = ?", (self.name,)).fetchone()
+                if count > self.disk_max_entries:
+                    self._conn.execute(
+                        "DELETE FROM memo WHERE rowid IN (SELECT rowid FROM memo WHERE name = ? ORDER BY rowid ASC LIMIT ?)",
+                        (self.name, count - self.disk_max_entries),
+                    )
+                self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM memo WHERE name = ?", (self.name,))
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "memory_bytes": self.bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,100 @@
+import re, zlib
+from collections import defaultdict
+from typing import List
+
+import numpy as np
+
+from backend.cache import normalize_text, text_hash
+from backend.distill import LEGAL_OPERATORS
+
+# Near-duplicate clauses within a document ("we retain your data for 5 years"
+# under three headings, sections copied between the privacy policy and ToS).
+# Exact copies share a normalized-text hash; near copies are found with
+# MinHash over word 3-shingles plus LSH banding, then confirmed with the exact
+# Jaccard similarity. Two clauses are only merged if they also agree on every
+# legal operator, modal and number, so "may share" / "may not share" or
+# "30 days" / "90 days" never collapse into one.
+
+NEAR_DUPLICATE_THRESHOLD = 0.85
+SHINGLE_WORDS = 3
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: ~95% recall at Jaccard 0.8, ~6% false candidates at 0.5
+
+MODALS = {"may", "might", "can", "cannot", "could", "shall", "should", "will", "would", "must", "without"}
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(0)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(normalize_text(text))
+
+
+def _shingles(words: List[str]) -> set:
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def _guard(words: List[str]) -> tuple:
+    """Meaning-changing words that must match exactly for two clauses to merge."""
+    return tuple(sorted(w for w in words if w in LEGAL_OPERATORS or w in MODALS or w.isdigit()))
+
+
+def _signature(shingles: set) -> np.ndarray:
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) % _PRIME for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def group_duplicates(texts: List[str], threshold: float = NEAR_DUPLICATE_THRESHOLD) -> List[int]:
+    """
+    For each text, the index of its group's representative: the first
+    occurrence among its exact and near duplicates (itself if it has none).
+    """
+    parent = list(range(len(texts)))
+
+    # Exact copies (normalized text)
+    first = {}
+    for i, text in enumerate(texts):
+        parent[i] = first.setdefault(text_hash(text), i)
+    unique = [i for i in range(len(texts)) if parent[i] == i]
+    if len(unique) < 2 or threshold >= 1.0:
+        return parent
+
+    # Near copies: LSH buckets on MinHash bands, confirmed by exact Jaccard
+    words = {i: _words(texts[i]) for i in unique}
+    shingles = {i: _shingles(words[i]) for i in unique}
+    guards = {i: _guard(words[i]) for i in unique}
+    rows = NUM_PERM // BANDS
+
+    buckets = defaultdict(list)
+    for i in unique:
+        signature = _signature(shingles[i])
+        for band in range(BANDS):
+            buckets[(band, guards[i], signature[band * rows:(band + 1) * rows].tobytes())].append(i)
+
+    checked = set()
+    for members in buckets.values():
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if (i, j) in checked:
+                    continue
+                checked.add((i, j))
+                a, b = shingles[i], shingles[j]
+                if len(a & b) / len(a | b) >= threshold:
+                    ri, rj = _find(parent, i), _find(parent, j)
+                    if ri != rj:
+                        parent[max(ri, rj)] = min(ri, rj)
+
+    return [_find(parent, _find(parent, i)) for i in range(len(texts))]
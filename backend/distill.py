@@ -0,0 +1,32 @@
+from typing import Iterable
+
+# Words that change legal meaning - NEVER remove these
+LEGAL_OPERATORS = {"not", "no", "never", "only", "unless", "except", "if", "then"}
+
+# Lemmas that carry no meaning for retrieval
+SKIP_LEMMAS = {"be", "have", "occur", "apply"}
+
+
+def distill_tokens(tokens: Iterable) -> str:
+    """
+    Reduce already-tagged spaCy tokens (a Doc or a Span) to the distilled
+    string used for embedding: nouns, verbs and numbers as lemmas, plus the
+    legal operators, deduplicated in order.
+    """
+    clean_tokens = []
+
+    for token in tokens:
+        # Keep Numbers (for retention logic), Nouns, and Verbs
+        if token.pos_ in ["NOUN", "PROPN", "VERB", "NUM"] or token.text.lower() in LEGAL_OPERATORS:
+            if token.lemma_.lower() not in SKIP_LEMMAS:
+                clean_tokens.append(token.lemma_.lower())
+
+    # Deduplicate while preserving order
+    seen = set()
+    final_tokens = []
+    for t in clean_tokens:
+        if t in LEGAL_OPERATORS or t not in seen:
+            final_tokens.append(t)
+            seen.add(t)
+
+    return " ".join(final_tokens)
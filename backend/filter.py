@@ -1,34 +1,63 @@
-import re
-import spacy
-from transformers import pipeline
+import json, logging
+from pathlib import Path
+from backend.distill import distill_tokens
+from backend.segmentation import SEGMENTERS, WINDOW_CHARS, iter_windows, load_pipeline
+from backend.cache import MemoCache, exact_hash, model_version, text_hash
+from backend.models import registry, ModelLoadError
+from backend.keywords import KeywordMatcher
+from backend.runtime import load_zero_shot
+from backend.telemetry import count_dedup, count_gate, stage
+from backend.dedup import group_duplicates
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+GATE2_MODEL = "valhalla/distilbart-mnli-12-1"
+
+def load_classifier():
+    # Backend (torch CPU/CUDA, ONNX fp32/int8) is picked in backend/runtime.py
+    return load_zero_shot(GATE2_MODEL)
 
 class RelevanceFilter:
 
-    def __init__(self):
+    # Gate 2 labels and the confidence above which "noise" drops a sentence
+    CANDIDATE_LABELS = ["legal clause", "irrelevant noise"]
+    NOISE_THRESHOLD = 0.7
+
+    # Documents longer than this are streamed through iter_document in windows
+    # instead of being parsed as one Doc
+    STREAM_THRESHOLD = 100_000
+
+    def __init__(self, batch_size: int = 16, segmenter: str = "parser",
+                 cache_size: int = 50_000, cache_path: Path | None = None):
         
+        # Number of sentences sent through the classifier per forward pass
+        self.batch_size = max(1, int(batch_size))
+
         # --- 1. Load spaCy (Chunking Engine) ---
-        # Optimization: We disable 'ner' and 'tagger' to make splitting 100x faster.
-        try:
-            self.nlp = spacy.load(
-                "en_core_web_sm",
-                disable=["ner", "tagger", "lemmatizer", "attribute_ruler"]
-            )
-            # Ensure the sentencizer (sentence splitter) is active
-            if "sentencizer" not in self.nlp.pipe_names:
-                self.nlp.add_pipe("sentencizer")
-        except Exception as e:
-            self.nlp = None
+        # The tagger and lemmatizer stay on so this one parse also yields the distilled
+        # text the matcher embeds. segmenter picks how sentences are found
+        # (see backend/segmentation.py): "parser", or "sentencizer"/"legal" for speed.
+        if segmenter not in SEGMENTERS:
+            raise ValueError(f"Unknown segmenter '{segmenter}', expected one of {SEGMENTERS}")
+        self.segmenter = segmenter
+
+        # Models live in the shared registry (backend/models.py): every
+        # RelevanceFilter in the process uses the same copies, loaded on first
+        # use or by the API's background warm-up.
+        self.nlp_name = f"spacy:{segmenter}"
+        registry.register(self.nlp_name, partial(load_pipeline, segmenter), warmup=lambda nlp: nlp("Warm up the pipeline."))
 
         # --- 2. Load DistilBERT (AI Filter - Gate 2) ---
-        # Optimization: CPU-friendly model loaded into RAM once.
-        try:
-            self.classifier = pipeline(
-                "zero-shot-classification",
-                model="valhalla/distilbart-mnli-12-1", 
-                device= 0 # -1 for CPU, 0 for GPU
-            )
-        except Exception as e:
-            self.classifier = None
+        # Optimization: CPU-friendly model loaded into RAM once. Optional: if it
+        # fails to load, Gate 2 is skipped (fail open) and the error is reported
+        # once here and in /readyz.
+        registry.register("gate2", load_classifier, warmup=self._warm_classifier, required=False)
+
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self._classifier_cache = None
+        self._gate2_warned = False
 
         # --- 3. Define Ontology (The Source of Truth) ---
         self.ontology = {
@@ -122,79 +151,273 @@ class RelevanceFilter:
             ]
         }
         
-        # --- 4. Build Reverse Index (Domain Lookup) ---
-        self.keyword_to_domain = {}
-        all_keywords = set()
-        
-        for domain, keywords in self.ontology.items():
-            for kw in keywords:
-                lower_kw = kw.lower()
-                all_keywords.add(lower_kw)
-                self.keyword_to_domain[lower_kw] = domain
-
-        # --- 5. Build Optimized Regex (Gate 1) ---
-        # Sort by length descending to match longer phrases first
-        sorted_kws = sorted(list(all_keywords), key=len, reverse=True)
-        # \b ensures we match "age" but not "page"
-        pattern_str = r'\b(?:' + '|'.join(map(re.escape, sorted_kws)) + r')\b'
-        self.ontology_regex = re.compile(pattern_str, re.IGNORECASE)
+        # --- 4. Build Keyword Automaton (Gate 1 + Domain Lookup) ---
+        # One Aho-Corasick pass per sentence, word-bounded like the old \b regex.
+        # Every term maps to ALL of its domains ("store" -> collection + retention).
+        self.keyword_matcher = KeywordMatcher.from_ontology(self.ontology)
+        self.keyword_to_domains = self.keyword_matcher.domains
+
+    @property
+    def nlp(self):
+        try:
+            return registry.get(self.nlp_name)
+        except ModelLoadError:
+            return None
+
+    @property
+    def classifier(self):
+        try:
+            return registry.get("gate2")
+        except ModelLoadError as e:
+            if not self._gate2_warned:
+                self._gate2_warned = True
+                logger.warning("Gate 2 disabled, keeping every Gate 1 match: %s", e)
+            return None
+
+    @property
+    def classifier_cache(self):
+        # Gate 2 memo: (top label, score) per exact (truncated) sentence, since the
+        # classifier sees its casing. The labels are part of the version since
+        # they change what the scores mean.
+        # cache_path adds a disk tier (e.g. backend.cache.MEMO_DISK_PATH).
+        if self._classifier_cache is None:
+            self._classifier_cache = MemoCache(
+                "gate2",
+                f"{model_version(GATE2_MODEL, self.classifier)}|{'/'.join(self.CANDIDATE_LABELS)}|exact",
+                max_entries=self.cache_size,
+                disk_path=self.cache_path,
+                encode=lambda v: json.dumps(v).encode("utf-8"),
+                decode=lambda b: tuple(json.loads(b)),
+            )
+        return self._classifier_cache
+
+    def _warm_classifier(self, classifier):
+        classifier(["We may share your data with third parties."], candidate_labels=self.CANDIDATE_LABELS)
 
     def process_document(self, raw_text):
-        if not self.nlp or not raw_text:
-            return []
+        if raw_text and len(raw_text) > self.STREAM_THRESHOLD:
+            return list(self.iter_document(raw_text))
+        return self.process_documents([raw_text])[0]
+
+    def iter_document(self, raw_text, window_chars: int = WINDOW_CHARS, pipe_batch_size: int = 4):
+        """
+        Streaming process_document for documents of any size. The text is cut
+        into paragraph-aligned windows (segmentation.iter_windows) that are
+        parsed lazily with nlp.pipe, and valid chunks are yielded in document
+        order as soon as their Gate 2 batch is done. Only a few windows' Docs
+        are alive at a time, so peak memory does not grow with the document.
+        Near-duplicates are collapsed within each part of batch_size * 8
+        sentences; across parts only exact copies are.
+        """
+        nlp = self.nlp
+        if not nlp or not raw_text:
+            return
+
+        docs = nlp.pipe((window for _, window in iter_windows(raw_text, window_chars)), batch_size=pipe_batch_size)
+        pending = []
+        # Dedup in gate_sentences only sees one part at a time, so exact copies
+        # (normalized text) are also collapsed across parts here: hash -> index
+        # of the first emitted chunk with that text, and each emitted chunk's
+        # document-wide representative. Near copies in different parts are not
+        # merged; they are matched and judged separately.
+        first_seen = {}
+        representative = []
+        while True:
+            with stage("segmentation"):
+                doc = next(docs, None)
+            if doc is not None:
+                pending.extend(doc.sents)
+            # Enough sentences for a few full Gate 2 batches (or the end): gate them and let their Docs go
+            if pending and (doc is None or len(pending) >= self.batch_size * 8):
+                chunks = self.gate_sentences([pending])[0]
+                emitted = len(representative)
+                for k, chunk in enumerate(chunks):
+                    # duplicate_of counts from the start of this part; make it document-wide
+                    duplicate_of = chunk["metadata"]["duplicate_of"]
+                    if duplicate_of is not None:
+                        rep = representative[emitted + duplicate_of]
+                    else:
+                        rep = first_seen.setdefault(text_hash(chunk["text"]), emitted + k)
+                    representative.append(rep)
+                    chunk["metadata"]["duplicate_of"] = rep if rep != emitted + k else None
+                    yield chunk
+                pending = []
+            if doc is None:
+                break
+
+    def process_documents(self, raw_texts, pipe_batch_size: int = 8):
+        """
+        process_document for many texts at once: spaCy parses them with
+        nlp.pipe, and Gate 2 classifies the candidates of every document as one
+        pool so its batches stay full across document boundaries. Returns one
+        list of valid chunks per input text.
+        """
+        long = {i for i, raw_text in enumerate(raw_texts) if raw_text and len(raw_text) > self.STREAM_THRESHOLD}
+        short = [raw_text if i not in long else "" for i, raw_text in enumerate(raw_texts)]
+        results = self.gate_sentences(self.segment_documents(short, pipe_batch_size))
+        for i in long:
+            results[i] = list(self.iter_document(raw_texts[i]))
+        return results
+
+    def segment_documents(self, raw_texts, pipe_batch_size: int = 8):
+        """
+        Step 1 of process_documents: the spaCy sentence spans of each text.
+        Texts are split into windows (segmentation.iter_windows), so any length
+        works; the spans of a text are all kept, use iter_document to stream.
+        """
+        results = [[] for _ in raw_texts]
+        nlp = self.nlp
+        todo = [i for i, raw_text in enumerate(raw_texts) if raw_text]
+        if not nlp or not todo:
+            return results
+
+        windows = [(i, window) for i in todo for _, window in iter_windows(raw_texts[i])]
 
         # 1. Chunking (spaCy)
-        doc = self.nlp(raw_text)
-        
-        valid_chunks = []
-        
-        # 2. Iterate over sentences
-        for sent in doc.sents:
-            text_chunk = sent.text.strip()
-            
-            if len(text_chunk) < 15:
-                continue
+        with stage("segmentation"):
+            for (i, _), doc in zip(windows, nlp.pipe([window for _, window in windows], batch_size=pipe_batch_size)):
+                results[i].extend(doc.sents)
+        return results
 
-            if "means" in text_chunk.lower(): # skip definitions
-                continue
+    def gate_sentences(self, sentence_lists):
+        """
+        Steps 2-3 of process_documents: both gates over lists of sentence spans
+        (one list per document), returning the valid chunks of each list.
+        """
+        results = [[] for _ in sentence_lists]
 
-            keep, reason, domains = self._is_relevant(text_chunk)
-            
-            if keep:
-                valid_chunks.append({
-                    "text": text_chunk,
-                    "metadata": {
-                        "domains": domains,       # e.g., ['LIABILITY', 'DATA_SHARING']
-                        "filter_reason": reason   # e.g., "Matched 'indemnify'"
-                    }
-                })
-        
-        return valid_chunks
+        # 2. Gate 1 over every sentence, collecting the survivors for Gate 2
+        candidates = []
+        total = 0
+        with stage("gate1"):
+            for i, sents in enumerate(sentence_lists):
+                total += len(sents)
+                for sent in sents:
+                    text_chunk = sent.text.strip()
+                    
+                    if len(text_chunk) < 15:
+                        continue
 
-    def _is_relevant(self, text):
+                    if "means" in text_chunk.lower(): # skip definitions
+                        continue
+
+                    matches, domains = self._keyword_gate(text_chunk)
+                    if matches:
+                        candidates.append((i, sent, text_chunk, matches, domains))
+        count_gate("gate1", kept=len(candidates), dropped=total - len(candidates))
+
+        # Collapse exact and near-duplicate clauses within each document: only
+        # the first occurrence is classified here and matched/judged later
+        with stage("dedup"):
+            representative = list(range(len(candidates)))
+            by_document = {}
+            for k, candidate in enumerate(candidates):
+                by_document.setdefault(candidate[0], []).append(k)
+            for members in by_document.values():
+                for k, rep in zip(members, group_duplicates([candidates[k][2] for k in members])):
+                    representative[k] = members[rep]
+        reps = [k for k in range(len(candidates)) if representative[k] == k]
+        count_dedup("clauses", unique=len(reps), duplicates=len(candidates) - len(reps))
+
+        # 3. Gate 2 once for all documents, in batches
+        with stage("gate2"):
+            rep_noise = dict(zip(reps, self._classify_batch([candidates[k][2] for k in reps])))
+        noise = [rep_noise[representative[k]] for k in range(len(candidates))]
+        dropped = sum(1 for verdict in noise if verdict is not None)
+        count_gate("gate2", kept=len(candidates) - dropped, dropped=dropped)
+
+        position = {}  # candidate index -> its index in results[i]
+        for k, ((i, sent, text_chunk, matches, domains), verdict) in enumerate(zip(candidates, noise)):
+            if verdict is not None:
+                continue
+            position[k] = len(results[i])
+            results[i].append({
+                "text": text_chunk,
+                "metadata": {
+                    "domains": domains,       # e.g., ['LIABILITY', 'DATA_SHARING']
+                    "filter_reason": f"Valid (Matched: {len(matches)} terms)",   # e.g., "Matched 'indemnify'"
+                    "distilled": distill_tokens(sent),   # legal_distill() of this sentence, from the same parse
+                    # index (in this document's chunks) of the earlier clause this one duplicates, or None
+                    "duplicate_of": position[representative[k]] if representative[k] != k else None,
+                }
+            })
         
-        matches = self.ontology_regex.findall(text)
-        if not matches:
-            return False, "Dropped: No Ontology terms found", []
+        return results
+
+    def _keyword_gate(self, text):
+        """
+        Gate 1: returns (hits, detected domains) for a sentence. Each hit is a
+        KeywordHit with the term, its offsets in text and all of its domains.
+        """
+        hits = self.keyword_matcher.find(text)
+        if not hits:
+            return [], []
 
         # Map Keywords to Domains
         detected_domains = set()
-        for m in matches:
-            dom = self.keyword_to_domain.get(m.lower())
-            if dom:
-                detected_domains.add(dom)
+        for hit in hits:
+            detected_domains.update(hit.domains)
         
-        domain_list = list(detected_domains)
+        return hits, sorted(detected_domains)
 
-        # --- Gate 2: AI Classifier ---
-        if self.classifier:
+    def _classify_batch(self, texts):
+        """
+        Gate 2 over many sentences at once.
+
+        Returns one entry per input text: None if the sentence is kept, or the
+        noise score (float) if the classifier confidently labelled it noise.
+        Sentences are bucketed by length so each batch pads to a similar size,
+        and only those missing from classifier_cache are sent to the model.
+        """
+        verdicts = [None] * len(texts)
+        classifier = self.classifier
+        if not classifier or not texts:
+            return verdicts
+
+        # Truncate to 512 for speed & safety
+        truncated = [t[:512] for t in texts]
+        keys = [exact_hash(t) for t in truncated]
+        known = self.classifier_cache.get_many(keys)
+
+        todo = list({keys[i]: i for i in range(len(truncated)) if keys[i] not in known}.values())
+        order = sorted(todo, key=lambda i: len(truncated[i]))
+
+        fresh = {}
+        for start in range(0, len(order), self.batch_size):
+            bucket = order[start:start + self.batch_size]
             try:
-                # Truncate to 512 for speed & safety
-                res = self.classifier(text[:512], candidate_labels=["legal clause", "irrelevant noise"])
-                
-                if res['labels'][0] == "irrelevant noise" and res['scores'][0] > 0.7:
-                    return False, f"AI detected noise ({res['scores'][0]:.2f})", []
+                results = classifier(
+                    [truncated[i] for i in bucket],
+                    candidate_labels=self.CANDIDATE_LABELS,
+                    batch_size=self.batch_size,
+                )
             except Exception:
-                pass # Fail open (Keep text if AI fails)
+                continue # Fail open (Keep text if AI fails)
+
+            if isinstance(results, dict):
+                results = [results]
+            for i, res in zip(bucket, results):
+                fresh[keys[i]] = (res['labels'][0], res['scores'][0])
+
+        self.classifier_cache.put_many(fresh)
+        known.update(fresh)
+
+        for i, key in enumerate(keys):
+            label, score = known.get(key, (None, 0.0))
+            if label == "irrelevant noise" and score > self.NOISE_THRESHOLD:
+                verdicts[i] = score
+
+        return verdicts
+
+    def _is_relevant(self, text):
+        
+        matches, domain_list = self._keyword_gate(text)
+        if not matches:
+            return False, "Dropped: No Ontology terms found", []
+
+        # --- Gate 2: AI Classifier ---
+        score = self._classify_batch([text])[0]
+        if score is not None:
+            return False, f"AI detected noise ({score:.2f})", []
 
         return True, f"Valid (Matched: {len(matches)} terms)", domain_list
@@ -0,0 +1,98 @@
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Tuple
+
+from backend.cache import text_hash
+
+# Incremental re-analysis: a new version of a document is compared sentence by
+# sentence with the previous one (AnalysisStore). Sentences seen before keep
+# their gate decision, matches and verdicts; only new or edited ones go
+# through the classifier, retrieval and the LLM.
+#
+# A version is stored as {"sentences": [record, ...]} in document order, where
+# a record is {"key": text_hash, "text": str, "matches": [match, ...],
+# "verdicts": [analysis item without "id" (or None), one per match]}.
+
+
+def plan_version(texts: List[str], previous: Dict[str, Any] | None) -> Tuple[List[Dict[str, Any] | None], List[int]]:
+    """
+    Line the new version's sentences up with the previous version. Returns one
+    entry per sentence, the reused record or None, plus the indices of the
+    sentences that need analysing. Reuse is by normalized sentence hash, so
+    moved sentences are reused too.
+    """
+    known = {}
+    for record in (previous or {}).get("sentences", []):
+        known.setdefault(record["key"], record)
+
+    reused, changed = [], []
+    for i, text in enumerate(texts):
+        record = known.get(text_hash(text))
+        if record is not None and all(v is not None for v in record["verdicts"]):
+            reused.append({**record, "text": text})
+        else:
+            reused.append(None)
+            changed.append(i)
+    return reused, changed
+
+
+def new_record(text: str, matches: List[Dict[str, Any]], verdicts: List[Dict[str, Any] | None]) -> Dict[str, Any]:
+    return {"key": text_hash(text), "text": text, "matches": matches, "verdicts": verdicts}
+
+
+def merge_records(records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """The whole version as (accepted_matches, analysis) in the shape build_response takes."""
+    accepted_matches, analysis = [], []
+    for record in records:
+        for match, verdict in zip(record["matches"], record["verdicts"]):
+            accepted_matches.append(match)
+            if verdict is not None:
+                analysis.append({**verdict, "id": len(accepted_matches)})
+    return accepted_matches, analysis
+
+
+def _violations(records: List[Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    found = {}
+    for record in records:
+        for match, verdict in zip(record["matches"], record["verdicts"]):
+            if verdict and verdict.get("violated") and not verdict.get("irrelevant"):
+                found[(record["key"], match.get("rule_id"))] = {
+                    "text": record["text"],
+                    "rule_id": match.get("rule_id"),
+                    "severity": str(match.get("severity") or "MEDIUM").upper(),
+                    "reason": verdict.get("reason", ""),
+                }
+    return found
+
+
+def describe_changes(previous: Dict[str, Any] | None, records: List[Dict[str, Any]], reanalyzed: int) -> Dict[str, Any]:
+    """What changed since the previous version: sentences added/modified/removed and violations gained/resolved."""
+    old = (previous or {}).get("sentences", [])
+    old_keys = [r["key"] for r in old]
+    new_keys = [r["key"] for r in records]
+
+    added, modified, removed = [], [], []
+    unchanged = 0
+    for op, i1, i2, j1, j2 in SequenceMatcher(None, old_keys, new_keys, autojunk=False).get_opcodes():
+        if op == "equal":
+            unchanged += i2 - i1
+        elif op == "insert":
+            added.extend(r["text"] for r in records[j1:j2])
+        elif op == "delete":
+            removed.extend(r["text"] for r in old[i1:i2])
+        else:  # replace: pair sentences up in order, any surplus is added/removed
+            pairs = min(i2 - i1, j2 - j1)
+            modified.extend({"before": old[i1 + k]["text"], "after": records[j1 + k]["text"]} for k in range(pairs))
+            removed.extend(r["text"] for r in old[i1 + pairs:i2])
+            added.extend(r["text"] for r in records[j1 + pairs:j2])
+
+    before, after = _violations(old), _violations(records)
+    return {
+        "previous_version": previous is not None,
+        "unchanged": unchanged,
+        "added": added,
+        "modified": modified,
+        "removed": removed,
+        "reanalyzed_sentences": reanalyzed,
+        "new_violations": [v for key, v in after.items() if key not in before],
+        "resolved_violations": [v for key, v in before.items() if key not in after],
+    }
@@ -2,27 +2,37 @@
 
 
 import httpx
+import asyncio
+import contextvars
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from backend.cache import VerdictCache
+from backend.telemetry import (COALESCED, ERRORS, LLM_REREQUESTS, LLM_RETRIES, LLM_TOKENS, PARSE_ATTEMPTS, PARSE_STRATEGY,
+                               count_dedup, stage)
 
 SYSTEM_PROMPT = """You are a policy compliance analyst who is analysing the compliance of a Terms of Service or Privacy Policy document against actual laws given within the prompt. 
 
 ----
-INPUT FORMAT: multiple sets of (id, TOS_Text, matched_law)
+INPUT FORMAT: the laws referenced in this prompt, each listed once under its law_id, then the (id, law_id, TOS_text) pairs to judge
 
-id: int
+LAWS:
+[law_id] full text of the law
+[law_id] full text of the law
+
+PAIRS:
+id: int | law: law_id
 TOS_text: ...
-Matched_law: ...
 
-id: int
+id: int | law: law_id
 TOS_text: ...
-Matched_law: ...
 ----
-It uses this and assigns {"id": int, "violated": bool, "irrelevant": bool, "reason": "1 line str"}, for each item in the same order as it appears. len(law pairs) == len(output dicts)
+Each TOS_text is judged against the law its law_id refers to. It uses this and assigns {"id": int, "violated": bool, "irrelevant": bool, "reason": "1 line str"}, for each item in the same order as it appears. len(law pairs) == len(output dicts)
 CASES:
 1. violated = true & irrelevant = false if law is violated by TOS.
 2. violated = false & irrelevant = false if law is compliant to TOS. 
-3. irrelevant = true & violated = false if matched_law and TOS_text are unrelated.
+3. irrelevant = true & violated = false if the law (by law_id) and TOS_text are unrelated.
 *** CRITICAL: "violated" and "irrelevant" CANNOT both be true. ***
 ----
 OUTPUT: (needs to be valid JSON and no conversational text)
@@ -40,14 +50,59 @@ OUTPUT: (needs to be valid JSON and no conversational text)
 
 OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL = "mistral:latest"
+# SYSTEM_PROMPT goes in Ollama's "system" field and is identical on every call,
+# so with the model kept loaded its evaluated prefix can be reused between calls
+KEEP_ALIVE = "30m"
+# Constrain generation to response_schema() via Ollama's "format" (needs Ollama >= 0.5)
+STRUCTURED_OUTPUT = True
+
+# Pairs are judged in shards of BATCH_SIZE so a long policy never overflows
+# num_predict; up to MAX_PARALLEL shards are in flight at once (Ollama only runs
+# them truly in parallel when started with OLLAMA_NUM_PARALLEL > 1).
+BATCH_SIZE = 8
+MAX_PARALLEL = 2
+
+# Connection pool shared by every request to Ollama (keep-alive, bounded)
+OLLAMA_LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=60.0)
+
+_sync_client: httpx.Client | None = None
+
+
+def get_client() -> httpx.Client:
+    """Process-wide keep-alive client for the sync path."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = httpx.Client(limits=OLLAMA_LIMITS)
+    return _sync_client
+
+
+def create_async_client() -> httpx.AsyncClient:
+    """AsyncClient for the API's lifetime; the caller owns it and must aclose() it."""
+    return httpx.AsyncClient(limits=OLLAMA_LIMITS)
+
+
+EXTRACT_STRATEGIES = ("1", "2", "3", "4", "5")
 
 
 def extract_json(text: str) -> dict | None:
     """Try multiple strategies to extract valid JSON from LLM response."""
+    result, strategy = _extract_json(text)
+    PARSE_STRATEGY.labels(strategy=strategy).inc()
+    # Every strategy before the winning one was tried and failed
+    for tried in EXTRACT_STRATEGIES:
+        if tried == strategy:
+            PARSE_ATTEMPTS.labels(strategy=tried, outcome="success").inc()
+            break
+        PARSE_ATTEMPTS.labels(strategy=tried, outcome="failed").inc()
+    return result
+
+
+def _extract_json(text: str) -> tuple[dict | None, str]:
+    """extract_json plus the index of the strategy that parsed it ("failed" if none did)."""
     
     # Strategy 1: Direct parse
     try:
-        return json.loads(text)
+        return json.loads(text), "1"
     except json.JSONDecodeError:
         pass
     
@@ -55,7 +110,7 @@ def extract_json(text: str) -> dict | None:
     cleaned = re.sub(r'^```(?:json)?\s*', '', text.strip())
     cleaned = re.sub(r'\s*```$', '', cleaned)
     try:
-        return json.loads(cleaned)
+        return json.loads(cleaned), "2"
     except json.JSONDecodeError:
         pass
     
@@ -63,7 +118,7 @@ def extract_json(text: str) -> dict | None:
     match = re.search(r'\{.*\}', text, re.DOTALL)
     if match:
         try:
-            return json.loads(match.group())
+            return json.loads(match.group()), "3"
         except json.JSONDecodeError:
             pass
     
@@ -74,14 +129,14 @@ def extract_json(text: str) -> dict | None:
         fixed = re.sub(r',(\s*[}\]])', r'\1', fixed)
         # Replace single quotes with double quotes (risky but worth trying)
         try:
-            return json.loads(fixed)
+            return json.loads(fixed), "4"
         except json.JSONDecodeError:
             pass
         
         # Try with single quote replacement
         fixed_quotes = fixed.replace("'", '"')
         try:
-            return json.loads(fixed_quotes)
+            return json.loads(fixed_quotes), "4"
         except json.JSONDecodeError:
             pass
     
@@ -92,65 +147,848 @@ def extract_json(text: str) -> dict | None:
         try:
             analysis = json.loads(array_match.group(1))
             summary = summary_match.group(1) if summary_match else "Analysis complete."
-            return {"analysis": analysis, "summary": summary}
+            return {"analysis": analysis, "summary": summary}, "5"
         except json.JSONDecodeError:
             pass
     
+    return None, "failed"
+
+
+def _loads_item(text: str) -> dict | None:
+    """Parse one {"id": ..., "violated": ...} object, with the same repairs as extract_json."""
+    for candidate in (text, re.sub(r',(\s*[}\]])', r'\1', text)):
+        for attempt in (candidate, candidate.replace("'", '"')):
+            try:
+                item = json.loads(attempt)
+            except json.JSONDecodeError:
+                continue
+            return item if isinstance(item, dict) else None
     return None
 
 
+class AnalysisStreamParser:
+    """
+    Incrementally pulls completed objects out of the "analysis" array while the
+    LLM response is still being generated. feed() each token chunk and it
+    returns the items that became complete with it.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.state = "seek"  # seek -> array -> done
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.obj_start = None
+
+    def feed(self, chunk: str) -> list[dict]:
+        self.buffer += chunk
+        items = []
+
+        if self.state == "seek":
+            match = re.search(r'"analysis"\s*:\s*\[', self.buffer)
+            if not match:
+                return items
+            self.pos = match.end()
+            self.state = "array"
+
+        while self.state == "array" and self.pos < len(self.buffer):
+            ch = self.buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                if self.depth == 0:
+                    self.obj_start = self.pos
+                self.depth += 1
+            elif ch == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    item = _loads_item(self.buffer[self.obj_start:self.pos + 1])
+                    if item is not None:
+                        items.append(item)
+                    self.obj_start = None
+            elif ch == "]" and self.depth == 0:
+                self.state = "done"
+            self.pos += 1
+
+        return items
+
+
 def generate_prompt(law_pairs: list[dict]) -> str:
-    pairs_str = "INPUT:\n"
+    """
+    The per-call part of the prompt (SYSTEM_PROMPT is sent separately). Many
+    sentences usually match the same statute, so each law's text is listed
+    once, labelled with its rule_id, and the pairs refer to it by that label.
+    Ids stay 1-based positions in law_pairs.
+    """
+    labels, laws, pairs = {}, [], []
     for i, pair in enumerate(law_pairs):
-        pairs_str += f"id: {i+1}\nTOS_text: {pair['TOS_text']}\nMatched_law: {pair['raw_law']}\n\n"
-    return SYSTEM_PROMPT + pairs_str + "\nRemember: Output ONLY valid JSON."
+        law = pair["raw_law"]
+        if law not in labels:
+            label = str(pair.get("rule_id") or f"LAW_{len(labels) + 1}")
+            if label in labels.values():  # same rule_id, different text: keep them apart
+                label = f"{label}_{len(labels) + 1}"
+            labels[law] = label
+            laws.append(f"[{label}] {law}")
+        pairs.append(f"id: {i+1} | law: {labels[law]}\nTOS_text: {pair['TOS_text']}\n")
+    return "LAWS:\n" + "\n".join(laws) + "\n\nPAIRS:\n" + "\n".join(pairs) + "\nRemember: Output ONLY valid JSON."
 
 
-def run_inference(law_pairs: list[dict], timeout: float = 150.0, max_retries: int = 1) -> dict:
-    prompt = generate_prompt(law_pairs)
-    
+def response_schema(size: int) -> dict:
+    """JSON schema of the analysis/summary contract in SYSTEM_PROMPT, for a prompt of `size` pairs."""
+    return {
+        "type": "object",
+        "properties": {
+            "analysis": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer", "minimum": 1, "maximum": size},
+                        "violated": {"type": "boolean"},
+                        "irrelevant": {"type": "boolean"},
+                        "reason": {"type": "string"},
+                    },
+                    "required": ["id", "violated", "irrelevant", "reason"],
+                },
+                "minItems": size,
+                "maxItems": size,
+            },
+            "summary": {"type": "string"},
+        },
+        "required": ["analysis", "summary"],
+    }
+
+
+def build_payload(law_pairs: list[dict], stream: bool = False) -> dict:
     payload = {
         "model": MODEL,
-        "prompt": prompt,
-        "stream": False,
+        "system": SYSTEM_PROMPT,
+        "prompt": generate_prompt(law_pairs),
+        "stream": stream,
+        "keep_alive": KEEP_ALIVE,
         "options": {
             "temperature": 0.1,
             "num_predict": 2048,
         }
     }
+    if STRUCTURED_OUTPUT:
+        payload["format"] = response_schema(len(law_pairs))
+    return payload
+
+
+def analysis_id(item, size: int) -> int | None:
+    """The 1-based id of an analysis item, or None if it is not a position in a prompt of `size` pairs."""
+    if not isinstance(item, dict) or isinstance(item.get("id"), bool):
+        return None
+    try:
+        value = int(item.get("id"))
+    except (TypeError, ValueError):
+        return None
+    return value if 1 <= value <= size else None
+
+
+def is_verdict(item: dict) -> bool:
+    return isinstance(item.get("violated"), bool) and isinstance(item.get("irrelevant"), bool)
+
+
+def check_analysis(analysis: list, size: int, answered=()) -> tuple[dict[int, dict], list[int]]:
+    """
+    Split a parsed "analysis" array for a prompt of `size` pairs into the
+    usable items by id, and the ids (1-based) that need asking again: missing,
+    malformed, or given several different verdicts. Ids in `answered` already
+    have a verdict and are neither returned nor counted.
+    """
+    found: dict[int, list[dict]] = {}
+    for item in analysis if isinstance(analysis, list) else []:
+        position = analysis_id(item, size)
+        if position is not None:
+            found.setdefault(position, []).append(item)
+
+    items, redo = {}, []
+    for item_id in range(1, size + 1):
+        if item_id in answered:
+            continue
+        candidates = found.get(item_id, [])
+        verdicts = {(c.get("violated"), c.get("irrelevant")) for c in candidates}
+        if not candidates:
+            reason = "missing"
+        elif len(verdicts) > 1:
+            reason = "duplicate"
+        elif not all(isinstance(v, bool) for v in next(iter(verdicts))):
+            reason = "malformed"
+        else:
+            items[item_id] = {**candidates[0], "id": item_id}
+            continue
+        LLM_REREQUESTS.labels(reason=reason).inc()
+        redo.append(item_id)
+    return items, redo
+
+
+def absorb(result: dict, pending: list[int], accepted: dict[int, dict]) -> list[int]:
+    """
+    Take the usable verdicts of a response to a prompt of law_pairs[pending]
+    into accepted (by position in the shard); returns what is still pending.
+    """
+    items, redo = check_analysis(result.get("analysis"), len(pending))
+    for item_id, item in items.items():
+        accepted[pending[item_id - 1]] = item
+    return [pending[item_id - 1] for item_id in redo]
+
+
+def shard_result(accepted: dict[int, dict], summary: str | None, pending: list[int] = ()) -> dict:
+    """
+    A shard's analysis. Pairs still pending once the retries are used up are
+    listed (1-based) under "unanswered", which merge_shard_results turns into a
+    shard error so the result is never taken (or cached) as complete.
+    """
+    analysis = [{**item, "id": i + 1} for i, item in sorted(accepted.items())]
+    result = {"analysis": analysis, "summary": summary or "Analysis complete."}
+    if pending:
+        result["unanswered"] = sorted(i + 1 for i in pending)
+    return result
+
+
+def unanswered_error(offset: int, unanswered: list[int]) -> str:
+    return f"pairs {', '.join(str(offset + i) for i in unanswered)}: no usable verdict from the model"
+
+
+def describe_error(e: Exception, timeout: float) -> str:
+    if isinstance(e, httpx.ConnectError):
+        return "Ollama server not reachable (connection refused)"
+    if isinstance(e, httpx.TimeoutException):
+        return f"Ollama request timed out after {timeout}s"
+    if isinstance(e, httpx.HTTPStatusError):
+        return f"Ollama HTTP error: {e.response.status_code}"
+    return f"Unexpected error: {str(e)}"
+
+
+def record_generation(data: dict) -> None:
+    """Count the prompt/generated tokens Ollama reports in a finished response."""
+    LLM_TOKENS.labels(direction="in").inc(data.get("prompt_eval_count") or 0)
+    LLM_TOKENS.labels(direction="out").inc(data.get("eval_count") or 0)
+
+
+def shard_pairs(law_pairs: list[dict], batch_size: int) -> list[tuple[int, list[dict]]]:
+    """Split law_pairs into (offset, shard) chunks of at most batch_size pairs."""
+    batch_size = max(1, int(batch_size))
+    return [(i, law_pairs[i:i + batch_size]) for i in range(0, len(law_pairs), batch_size)]
+
+
+def remap_ids(analysis: list, offset: int, size: int) -> list[dict]:
+    """
+    Shift a shard's 1-based ids to global ids. Items whose id is not a valid
+    position in the shard are dropped, since they cannot be joined to a match.
+    """
+    remapped = []
+    for item in analysis:
+        if not isinstance(item, dict):
+            continue
+        try:
+            local_id = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        if 1 <= local_id <= size:
+            remapped.append({**item, "id": local_id + offset})
+    return remapped
+
+
+def merge_summaries(summaries: list[str]) -> str:
+    unique = []
+    for summary in summaries:
+        summary = (summary or "").strip()
+        if summary and summary not in unique:
+            unique.append(summary)
+    return " ".join(unique) if unique else "Analysis complete."
+
+
+def merge_shard_results(shard_results: list[tuple[int, int, dict]]) -> dict:
+    """
+    Combine (offset, shard size, result) triples into one run_inference result.
+    Fails only if every shard failed; otherwise failed shards, and pairs a shard
+    left unanswered, are listed under "shard_errors" and their pairs are simply
+    absent from "analysis".
+    """
+    analysis, summaries, errors = [], [], []
+    for offset, size, result in sorted(shard_results, key=lambda r: r[0]):
+        if "error" in result:
+            errors.append(f"pairs {offset + 1}-{offset + size}: {result['error']}")
+            continue
+        analysis.extend(remap_ids(result.get("analysis", []), offset, size))
+        summaries.append(result.get("summary", ""))
+        if result.get("unanswered"):
+            errors.append(unanswered_error(offset, result["unanswered"]))
+
+    if errors and not summaries:
+        return {"error": "; ".join(errors)}
+
+    merged = {"analysis": analysis, "summary": merge_summaries(summaries)}
+    if errors:
+        merged["shard_errors"] = errors
+    return merged
+
+
+class ShardRun:
+    """
+    One shard across its attempts: the pairs still without a usable verdict,
+    the verdicts accepted so far, and the last error. A retry after an error
+    or unparseable output repeats the request; a retry after a valid response
+    only re-asks the pairs whose ids were missing, malformed or contradicted.
+    _run_shard and _run_shard_async only differ in how payload() is sent.
+    """
+
+    def __init__(self, law_pairs: list[dict]):
+        self.law_pairs = law_pairs
+        self.pending = list(range(len(law_pairs)))
+        self.accepted: dict[int, dict] = {}
+        self.summary = None
+        self.parsed = False
+        self.last_error = self.raw_response = None
+
+    def payload(self) -> dict:
+        return build_payload([self.law_pairs[i] for i in self.pending])
+
+    def handle_reply(self, data: dict) -> bool:
+        """Take in one Ollama reply; returns True once every pair has a verdict."""
+        record_generation(data)
+        self.raw_response = data.get("response", "")
+        result = extract_json(self.raw_response)
+        if result is None:
+            ERRORS.labels(stage="llm", type="unparseable_output").inc()
+            self.last_error = f"Failed to parse JSON from model response: {self.raw_response}"
+            return False
+        
+        self.parsed = True
+        self.summary = self.summary or result.get("summary")
+        self.pending = absorb(result, self.pending, self.accepted)
+        return not self.pending
+
+    def result(self) -> dict:
+        if not self.parsed:
+            if self.raw_response is not None:
+                return {"raw": self.raw_response, "error": self.last_error}
+            return {"error": self.last_error}
+        return shard_result(self.accepted, self.summary, self.pending)
+
+
+def _run_shard(law_pairs: list[dict], timeout: float, max_retries: int) -> dict:
+    """Judge one shard (see ShardRun); ids in the result are 1-based positions in law_pairs."""
+    client = get_client()
+    run = ShardRun(law_pairs)
+    for attempt in range(max_retries + 1):
+        if attempt:
+            LLM_RETRIES.inc()
+        try:
+            with stage("llm"):
+                resp = client.post(OLLAMA_URL, json=run.payload(), timeout=timeout)
+                resp.raise_for_status()
+            data = resp.json()
+        except Exception as e:
+            run.last_error = describe_error(e, timeout)
+            continue
+        if run.handle_reply(data):
+            break
+    return run.result()
+
+
+async def _run_shard_async(law_pairs: list[dict], client: httpx.AsyncClient, timeout: float, max_retries: int) -> dict:
+    """Same contract as _run_shard, awaiting Ollama on client."""
+    run = ShardRun(law_pairs)
+    for attempt in range(max_retries + 1):
+        if attempt:
+            LLM_RETRIES.inc()
+        try:
+            with stage("llm"):
+                resp = await client.post(OLLAMA_URL, json=run.payload(), timeout=timeout)
+                resp.raise_for_status()
+            data = resp.json()
+        except Exception as e:
+            run.last_error = describe_error(e, timeout)
+            continue
+        if run.handle_reply(data):
+            break
+    return run.result()
+
+
+def _run_sharded(law_pairs: list[dict], timeout: float, max_retries: int, batch_size: int, max_parallel: int) -> dict:
+    """
+    Judge law_pairs in shards of batch_size, up to max_parallel at a time.
+    Each shard is retried on its own; ids in the result are global (1-based
+    positions in law_pairs).
+    """
+    shards = shard_pairs(law_pairs, batch_size)
+    if not shards:
+        return {"analysis": [], "summary": "Analysis complete."}
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(shards)))) as pool:
+        # Each shard runs in a copy of this context so its timings land in the caller's trace
+        futures = [(offset, len(shard), pool.submit(contextvars.copy_context().run, _run_shard, shard, timeout, max_retries))
+                   for offset, shard in shards]
+        shard_results = [(offset, size, future.result()) for offset, size, future in futures]
+    
+    return merge_shard_results(shard_results)
+
+
+async def _run_sharded_async(law_pairs: list[dict], client: httpx.AsyncClient, timeout: float, max_retries: int,
+                             batch_size: int, max_parallel: int) -> dict:
+    shards = shard_pairs(law_pairs, batch_size)
+    if not shards:
+        return {"analysis": [], "summary": "Analysis complete."}
+    
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+    
+    async def run(shard):
+        async with semaphore:
+            return await _run_shard_async(shard, client, timeout, max_retries)
+    
+    results = await asyncio.gather(*(run(shard) for _, shard in shards))
+    return merge_shard_results([(offset, len(shard), result) for (offset, shard), result in zip(shards, results)])
+
+
+async def _stream_shard(law_pairs: list[dict], client: httpx.AsyncClient, timeout: float, max_retries: int):
+    """
+    Stream one shard's verdicts. An item is emitted as soon as it is usable: an
+    id in this shard not answered yet, with bool violated/irrelevant. A streamed
+    verdict cannot be taken back, so the first usable item for an id is the
+    answer, and later items for it (repeats or contradictions) are ignored.
+    Once the response ends, ids still unanswered (missing or malformed) are
+    checked as check_analysis does and asked again without streaming.
+    """
+    payload = build_payload(law_pairs, stream=True)
+    size = len(law_pairs)
     
     last_error = None
     for attempt in range(max_retries + 1):
+        if attempt:
+            LLM_RETRIES.inc()
+        parser = AnalysisStreamParser()
+        parsed, emitted = [], {}
         try:
-            with httpx.Client(timeout=timeout) as client:
-                resp = client.post(OLLAMA_URL, json=payload)
-                resp.raise_for_status()
-                data = resp.json()
-            
-            raw_response = data.get("response", "")
-            
-            result = extract_json(raw_response)
-            if result is not None:
-                return result
-            
-            last_error = f"Failed to parse JSON from model response: {raw_response}"
-            if attempt < max_retries:
-                continue
-            return {"raw": raw_response, "error": last_error}
-        
-        except httpx.ConnectError:
-            last_error = "Ollama server not reachable (connection refused)"
-        except httpx.TimeoutException:
-            last_error = f"Ollama request timed out after {timeout}s"
-        except httpx.HTTPStatusError as e:
-            last_error = f"Ollama HTTP error: {e.response.status_code}"
+            with stage("llm"):
+                async with client.stream("POST", OLLAMA_URL, json=payload, timeout=timeout) as resp:
+                    resp.raise_for_status()
+                    async for line in resp.aiter_lines():
+                        if not line.strip():
+                            continue
+                        data = json.loads(line)
+                        for item in parser.feed(data.get("response", "")):
+                            parsed.append(item)
+                            item_id = analysis_id(item, size)
+                            if item_id is not None and item_id not in emitted and is_verdict(item):
+                                emitted[item_id] = {**item, "id": item_id}
+                                yield {"type": "item", "item": emitted[item_id]}
+                        if data.get("done"):
+                            record_generation(data)
+                            break
         except Exception as e:
-            last_error = f"Unexpected error: {str(e)}"
+            last_error = describe_error(e, timeout)
+            if emitted:
+                break
+            continue
         
+        # Items the incremental parser could not see (e.g. malformed array) but the
+        # full-text strategies recover are checked together with the streamed ones
+        result = extract_json(parser.buffer) or {}
+        if parsed or result:
+            recovered = result.get("analysis")
+            items, redo = check_analysis(parsed + (recovered if isinstance(recovered, list) else []), size, emitted)
+            for item_id, item in items.items():
+                emitted[item_id] = item
+                yield {"type": "item", "item": item}
+            
+            # Pairs without a usable verdict are asked again on their own (without streaming)
+            if redo and attempt < max_retries:
+                LLM_RETRIES.inc()
+                retry = await _run_shard_async([law_pairs[i - 1] for i in redo], client, timeout, max_retries - attempt - 1)
+                for item in retry.get("analysis", []):
+                    item = {**item, "id": redo[item["id"] - 1]}
+                    emitted[item["id"]] = item
+                    yield {"type": "item", "item": item}
+            done = {"type": "result", "analysis": list(emitted.values()), "summary": result.get("summary", "Analysis complete.")}
+            unanswered = [i for i in range(1, size + 1) if i not in emitted]
+            if unanswered:
+                done["unanswered"] = unanswered
+            yield done
+            return
+        
+        ERRORS.labels(stage="llm", type="unparseable_output").inc()
+        last_error = f"Failed to parse JSON from model response: {parser.buffer}"
         if attempt < max_retries:
             continue
     
-    return {"error": last_error}
+    yield {"type": "error", "error": last_error}
+
+
+async def _stream_sharded(law_pairs: list[dict], client: httpx.AsyncClient, timeout: float, max_retries: int,
+                          batch_size: int, max_parallel: int):
+    shards = shard_pairs(law_pairs, batch_size)
+    queue: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+    
+    async def pump(offset, shard):
+        try:
+            async with semaphore:
+                async for event in _stream_shard(shard, client, timeout, max_retries):
+                    await queue.put((offset, len(shard), event))
+        finally:
+            await queue.put(None)  # shard finished
+    
+    tasks = [asyncio.create_task(pump(offset, shard)) for offset, shard in shards]
+    analysis, summaries, errors = [], [], []
+    try:
+        remaining = len(tasks)
+        while remaining:
+            message = await queue.get()
+            if message is None:
+                remaining -= 1
+                continue
+            offset, size, event = message
+            if event["type"] == "item":
+                for item in remap_ids([event["item"]], offset, size):
+                    analysis.append(item)
+                    yield {"type": "item", "item": item}
+            elif event["type"] == "result":
+                summaries.append(event["summary"])
+                if event.get("unanswered"):
+                    errors.append(unanswered_error(offset, event["unanswered"]))
+            else:
+                errors.append(f"pairs {offset + 1}-{offset + size}: {event['error']}")
+    finally:
+        for task in tasks:
+            task.cancel()
+    
+    if errors and not summaries and not analysis:
+        yield {"type": "error", "error": "; ".join(errors)}
+        return
+    
+    done = {"type": "result", "analysis": analysis, "summary": merge_summaries(summaries)}
+    if errors:
+        done["shard_errors"] = errors
+    yield done
+
+
+# --- Verdict cache ---
+# Bump PROMPT_VERSION whenever SYSTEM_PROMPT / generate_prompt change meaning,
+# so verdicts produced by the old prompt are no longer served.
+PROMPT_VERSION = "3"
+VERDICT_CACHE_PATH = Path(__file__).resolve().parent / "database" / "verdict_cache.sqlite3"
+
+verdict_cache = VerdictCache(VERDICT_CACHE_PATH)
+
+
+async def off_loop(fn, *args):
+    """Run a blocking verdict-cache call (SQLite) on the default executor, in the caller's trace context."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, contextvars.copy_context().run, fn, *args)
+
+
+def split_cached(law_pairs: list[dict]) -> tuple[list[dict], list[int]]:
+    """
+    Look every pair up in the verdict cache. Returns the cached analysis items
+    (with global ids) and the indices of the pairs that still need the LLM.
+    """
+    keys = [VerdictCache.key(p.get("TOS_text", ""), p.get("rule_id"), MODEL, PROMPT_VERSION) for p in law_pairs]
+    hits = verdict_cache.get_many(keys)
+    
+    cached, misses = [], []
+    for i, key in enumerate(keys):
+        if key in hits:
+            cached.append({"id": i + 1, **hits[key]})
+        else:
+            misses.append(i)
+    return cached, order_by_law(law_pairs, misses)
+
+
+def order_by_law(law_pairs: list[dict], indices: list[int]) -> list[int]:
+    """
+    indices regrouped so pairs matched to the same law are adjacent (stable,
+    laws in order of first appearance). Shards then cover fewer distinct laws,
+    and generate_prompt lists each one once per shard.
+    """
+    first = {}
+    for i in indices:
+        first.setdefault(law_pairs[i].get("raw_law"), len(first))
+    return sorted(indices, key=lambda i: first[law_pairs[i].get("raw_law")])
+
+
+def adopt_verdicts(law_pairs: list[dict], misses: list[int], analysis: list[dict]) -> list[dict]:
+    """
+    Map LLM items for the miss-only prompt back to global ids and store the
+    well-formed ones in the verdict cache.
+    """
+    adopted, entries = [], {}
+    for item in remap_ids(analysis, 0, len(misses)):
+        idx = misses[item["id"] - 1]
+        adopted.append({**item, "id": idx + 1})
+        if is_verdict(item):
+            pair = law_pairs[idx]
+            entries[VerdictCache.key(pair.get("TOS_text", ""), pair.get("rule_id"), MODEL, PROMPT_VERSION)] = item
+    verdict_cache.put_many(entries)
+    return adopted
+
+
+def cached_summary(analysis: list[dict]) -> str:
+    violated = sum(1 for item in analysis if item.get("violated") and not item.get("irrelevant"))
+    return f"{violated} potential violation(s) found across {len(analysis)} matched clauses (from cached verdicts)."
+
+
+def combine_with_cache(law_pairs: list[dict], cached: list[dict], misses: list[int], result: dict | None) -> dict:
+    """
+    Cached and fresh verdicts as one result over law_pairs. Where no LLM
+    summary applies, "summary" is None: it is counted by expand_result over
+    the items it returns, not over these collapsed pairs.
+    """
+    if result is None:
+        return {"analysis": cached, "summary": None}
+    if "error" in result and not cached:
+        return result
+    
+    analysis = sorted(cached + adopt_verdicts(law_pairs, misses, result.get("analysis", [])), key=lambda item: item["id"])
+    combined = {"analysis": analysis, "summary": result.get("summary")}
+    if "error" in result:
+        combined["summary"] = None
+        combined["shard_errors"] = [result["error"]]
+    elif "shard_errors" in result:
+        combined["shard_errors"] = result["shard_errors"]
+    return combined
+
+
+def pair_key(pair: dict) -> tuple:
+    """Pairs with the same key get one verdict: the same clause (or a near copy of it, see dedup.py) against the same rule."""
+    return (pair.get("duplicate_of") or pair.get("TOS_text", ""), pair.get("rule_id"))
+
+
+def collapse_pairs(law_pairs: list[dict]) -> tuple[list[dict], list[int]]:
+    """Keep one pair per pair_key; returns them and, per pair, the index of its representative."""
+    unique, positions = pack_documents([law_pairs])
+    count_dedup("llm_pairs", len(unique), len(law_pairs) - len(unique))
+    return unique, positions[0]
+
+
+def expand_items(items: list[dict], positions: list[int]) -> list[dict]:
+    """Fan analysis items for collapsed pairs back out to every pair they stand for."""
+    occurrences = {}
+    for i, pos in enumerate(positions):
+        occurrences.setdefault(pos + 1, []).append(i + 1)
+    return [{**item, "id": i} for item in items if isinstance(item, dict) for i in occurrences.get(item.get("id"), [])]
+
+
+def expand_result(result: dict, positions: list[int]) -> dict:
+    if "analysis" not in result:
+        return result
+    analysis = sorted(expand_items(result["analysis"], positions), key=lambda item: item["id"])
+    return {**result, "analysis": analysis, "summary": result.get("summary") or cached_summary(analysis)}
+
+
+def run_inference(law_pairs: list[dict], timeout: float = 150.0, max_retries: int = 1,
+                  batch_size: int = BATCH_SIZE, max_parallel: int = MAX_PARALLEL) -> dict:
+    """
+    Judge every (TOS_text, raw_law) pair. Duplicate pairs are judged once and
+    cached verdicts are served directly; only the misses go to Ollama, in
+    shards of batch_size, up to max_parallel at a time. Ids in the result are
+    1-based positions in law_pairs.
+    """
+    unique, positions = collapse_pairs(law_pairs)
+    cached, misses = split_cached(unique)
+    result = None
+    if misses:
+        result = _run_sharded([unique[i] for i in misses], timeout, max_retries, batch_size, max_parallel)
+    return expand_result(combine_with_cache(unique, cached, misses, result), positions)
+
+
+# Verdict cache key -> future of the analysis item (without "id", None on failure)
+# for pairs some request in this process is currently sending to Ollama
+_inflight_verdicts: dict[str, asyncio.Future] = {}
+
+
+async def _run_coalesced_async(law_pairs: list[dict], client: httpx.AsyncClient, timeout: float, max_retries: int,
+                               batch_size: int, max_parallel: int) -> dict:
+    """
+    _run_sharded_async, sharing work with concurrent requests: pairs another
+    request is already sending to Ollama are awaited instead of sent again, and
+    only if that call fails for them are they sent from here. Our own call runs
+    in its own task, so cancelling this request does not fail the requests
+    waiting on it. Same result contract (ids are positions in law_pairs).
+    """
+    loop = asyncio.get_running_loop()
+    keys = [VerdictCache.key(p.get("TOS_text", ""), p.get("rule_id"), MODEL, PROMPT_VERSION) for p in law_pairs]
+    own, waiting, futures = [], [], {}
+    for k, key in enumerate(keys):
+        if key in _inflight_verdicts:
+            futures[k] = _inflight_verdicts[key]
+            waiting.append(k)
+        else:
+            _inflight_verdicts[key] = futures[k] = loop.create_future()
+            own.append(k)
+    COALESCED.labels(level="llm_pair", role="leader").inc(len(own))
+    COALESCED.labels(level="llm_pair", role="waiter").inc(len(waiting))
+    
+    async def lead() -> dict:
+        result = None
+        try:
+            result = await _run_sharded_async([law_pairs[k] for k in own], client, timeout, max_retries, batch_size, max_parallel)
+            return result
+        finally:
+            items = {item["id"]: item for item in remap_ids((result or {}).get("analysis", []), 0, len(own))}
+            for n, k in enumerate(own):
+                if _inflight_verdicts.get(keys[k]) is futures[k]:
+                    del _inflight_verdicts[keys[k]]
+                item = items.get(n + 1)
+                futures[k].set_result({key: value for key, value in item.items() if key != "id"} if item else None)
+    
+    analysis, summaries, errors = [], [], []
+    
+    def collect(result: dict | None, positions: list[int]) -> None:
+        if result is None:
+            return
+        if "error" in result:
+            errors.append(result["error"])
+            return
+        analysis.extend({**item, "id": positions[item["id"] - 1] + 1} for item in remap_ids(result.get("analysis", []), 0, len(positions)))
+        summaries.append(result.get("summary", ""))
+        errors.extend(result.get("shard_errors", []))
+    
+    if own:
+        collect(await asyncio.shield(asyncio.create_task(lead())), own)
+    
+    retry = []
+    if waiting:
+        for k, item in zip(waiting, await asyncio.shield(asyncio.gather(*(futures[k] for k in waiting)))):
+            if item is None:
+                retry.append(k)
+            else:
+                analysis.append({**item, "id": k + 1})
+    if retry:
+        collect(await _run_sharded_async([law_pairs[k] for k in retry], client, timeout, max_retries, batch_size, max_parallel), retry)
+    
+    if errors and not analysis:
+        return {"error": "; ".join(errors)}
+    result = {"analysis": sorted(analysis, key=lambda item: item["id"]), "summary": merge_summaries(summaries) if summaries else ""}
+    if errors:
+        result["shard_errors"] = errors
+    return result
+
+
+async def _run_unique_async(unique: list[dict], client: httpx.AsyncClient, timeout: float, max_retries: int,
+                            batch_size: int, max_parallel: int) -> dict:
+    cached, misses = await off_loop(split_cached, unique)
+    result = None
+    if misses:
+        result = await _run_coalesced_async([unique[i] for i in misses], client, timeout, max_retries, batch_size, max_parallel)
+    return await off_loop(combine_with_cache, unique, cached, misses, result)
+
+
+async def run_inference_async(law_pairs: list[dict], client: httpx.AsyncClient, timeout: float = 150.0, max_retries: int = 1,
+                              batch_size: int = BATCH_SIZE, max_parallel: int = MAX_PARALLEL) -> dict:
+    """Same contract as run_inference, awaiting Ollama on a shared AsyncClient."""
+    unique, positions = collapse_pairs(law_pairs)
+    result = await _run_unique_async(unique, client, timeout, max_retries, batch_size, max_parallel)
+    return expand_result(result, positions)
+
+
+def count_summary(analysis: list[dict]) -> str:
+    """Summary for results assembled from several LLM calls, where no single LLM summary applies."""
+    violated = sum(1 for item in analysis if item.get("violated") and not item.get("irrelevant"))
+    return f"{violated} potential violation(s) found across {len(analysis)} matched clauses."
+
+
+def pack_documents(documents: list[list[dict]]) -> tuple[list[dict], list[list[int]]]:
+    """
+    Pool the law pairs of several documents into one list, keeping each
+    pair_key once. Returns the unique pairs and, per document, the index into
+    them of each of its pairs.
+    """
+    unique, index, positions = [], {}, []
+    for law_pairs in documents:
+        doc_positions = []
+        for pair in law_pairs:
+            key = pair_key(pair)
+            if key not in index:
+                index[key] = len(unique)
+                unique.append(pair)
+            doc_positions.append(index[key])
+        positions.append(doc_positions)
+    return unique, positions
+
+
+def unpack_documents(result: dict, positions: list[list[int]]) -> list[dict]:
+    """
+    Split a run_inference result over packed pairs back into one result per
+    document, with ids renumbered to that document's own pairs. The summary of
+    a packed run spans many documents, so each gets a count-based one instead.
+    """
+    if "error" in result:
+        return [{"error": result["error"]} for _ in positions]
+
+    by_id = {item["id"]: item for item in result.get("analysis", []) if isinstance(item, dict) and "id" in item}
+    unpacked = []
+    for doc_positions in positions:
+        analysis = [{**by_id[pos + 1], "id": local + 1} for local, pos in enumerate(doc_positions) if pos + 1 in by_id]
+        doc_result = {"analysis": analysis, "summary": count_summary(analysis)}
+        if len(analysis) < len(doc_positions) and "shard_errors" in result:
+            doc_result["shard_errors"] = result["shard_errors"]
+        unpacked.append(doc_result)
+    return unpacked
+
+
+async def run_inference_batch_async(documents: list[list[dict]], client: httpx.AsyncClient, timeout: float = 150.0,
+                                    max_retries: int = 1, batch_size: int = BATCH_SIZE,
+                                    max_parallel: int = MAX_PARALLEL) -> list[dict]:
+    """
+    run_inference_async for many documents at once: their pairs are pooled and
+    deduplicated, so prompts are packed full across document boundaries, then
+    the verdicts are split back into one result per document.
+    """
+    unique, positions = pack_documents(documents)
+    total = sum(len(law_pairs) for law_pairs in documents)
+    count_dedup("llm_pairs", len(unique), total - len(unique))
+    if not unique:
+        return [{"analysis": [], "summary": "Analysis complete."} for _ in documents]
+    result = await _run_unique_async(unique, client, timeout, max_retries, batch_size, max_parallel)
+    return unpack_documents(result, positions)
+
+
+async def stream_inference(law_pairs: list[dict], client: httpx.AsyncClient, timeout: float = 150.0, max_retries: int = 1,
+                           batch_size: int = BATCH_SIZE, max_parallel: int = MAX_PARALLEL):
+    """
+    Streaming variant of run_inference_async. Yields, in order:
+      {"type": "item", "item": {...}}                 for each analysis item (global id): cached ones first,
+                                                      then the rest as soon as the LLM completes them
+      {"type": "result", "analysis": [...], "summary": str}   once every shard has finished
+    or a single {"type": "error", "error": str} if nothing could be judged. A
+    shard is only retried if it failed before any of its items were emitted.
+    """
+    unique, positions = collapse_pairs(law_pairs)
+    cached, misses = await off_loop(split_cached, unique)
+    cached = expand_items(cached, positions)
+    for item in cached:
+        yield {"type": "item", "item": item}
+    
+    if not misses:
+        yield {"type": "result", "analysis": cached, "summary": cached_summary(cached)}
+        return
+    
+    miss_pairs = [unique[i] for i in misses]
+    analysis = list(cached)
+    async for event in _stream_sharded(miss_pairs, client, timeout, max_retries, batch_size, max_parallel):
+        if event["type"] == "item":
+            for item in expand_items(await off_loop(adopt_verdicts, unique, misses, [event["item"]]), positions):
+                analysis.append(item)
+                yield {"type": "item", "item": item}
+        elif event["type"] == "result":
+            yield {**event, "analysis": analysis}
+        elif cached:
+            yield {"type": "result", "analysis": analysis, "summary": cached_summary(analysis)}
+        else:
+            yield event
 
 
 if __name__ == "__main__":
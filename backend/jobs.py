@@ -0,0 +1,265 @@
+import asyncio, json, logging, math, os, sqlite3, threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict
+
+from backend.telemetry import JOB_QUEUE_DEPTH, JOBS, start_trace
+
+logger = logging.getLogger(__name__)
+
+# Asynchronous analyses: POST /jobs queues a document and returns at once,
+# GET /jobs/{id} polls it. A fixed number of workers per process drain a
+# bounded queue, so a burst of users waits in line instead of piling up
+# concurrent Ollama calls and timing out. Job state lives in SQLite, so any
+# worker process can answer a poll for a job another one is running.
+
+JOB_STORE_PATH = Path(__file__).resolve().parent / "database" / "jobs.sqlite3"
+
+JOB_WORKERS = 2          # jobs running at once per process (i.e. concurrent Ollama analyses)
+MAX_QUEUED_JOBS = 64     # waiting jobs per process before POST /jobs answers 429
+JOB_TTL = 3600.0         # seconds a job (and its result) is kept after it was last updated
+HEARTBEAT_INTERVAL = 15.0  # seconds between refreshes of every queued/running job's `updated`
+STALE_AFTER = 120.0      # a queued/running job not refreshed for this long lost its worker: reported failed
+
+# Progress callback handed to a job: progress(stage, **details)
+Progress = Callable[..., None]
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+ABANDONED = {"status_code": 503, "detail": "Job abandoned (worker stopped)"}
+
+
+class JobStore:
+    """
+    Status, progress and result of every job, in SQLite. Jobs expire ttl
+    seconds after their last update; expired rows are purged on write and
+    never returned. The worker owning a queued or running job refreshes it
+    every HEARTBEAT_INTERVAL; one not refreshed for stale_after seconds (its
+    process died or restarted) is reported failed.
+    """
+
+    def __init__(self, path: Path, ttl: float = JOB_TTL, stale_after: float = STALE_AFTER):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect()
+        os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self) -> None:
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                progress TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated ON jobs(updated)")
+        self._conn.commit()
+
+    def create(self, job_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE updated < ?", (now - self.ttl,))
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, progress, created, updated) VALUES (?, 'queued', '{}', ?, ?)",
+                (job_id, now, now),
+            )
+            self._conn.commit()
+
+    def update(self, job_id: str, status: str, progress: Dict[str, Any] | None = None,
+               result: Any = None, error: Dict[str, Any] | None = None) -> None:
+        fields = {"status": status, "updated": time.time()}
+        if progress is not None:
+            fields["progress"] = json.dumps(progress)
+        if result is not None:
+            fields["result"] = json.dumps(result)
+        if error is not None:
+            fields["error"] = json.dumps(error)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+            self._conn.commit()
+
+    def touch(self, job_ids: list[str]) -> None:
+        """Heartbeat: mark these jobs as still owned by a live worker."""
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET updated = ? WHERE id IN ({', '.join('?' * len(job_ids))}) AND status IN ('queued', 'running')",
+                (time.time(), *job_ids),
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Dict[str, Any] | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, progress, result, error, created, updated FROM jobs WHERE id = ? AND updated >= ?",
+                (job_id, now - self.ttl),
+            ).fetchone()
+        if row is None:
+            return None
+        status, progress, result, error, created, updated = row
+        if status in ("queued", "running") and updated < now - self.stale_after:
+            status, error = "failed", json.dumps(ABANDONED)
+        return {
+            "job_id": job_id,
+            "status": status,
+            "progress": json.loads(progress),
+            "result": json.loads(result) if result is not None else None,
+            "error": json.loads(error) if error is not None else None,
+            "created": created,
+            "updated": updated,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT CASE WHEN status IN ('queued', 'running') AND updated < ? THEN 'failed' ELSE status END AS state,
+                          COUNT(*)
+                   FROM jobs WHERE updated >= ? GROUP BY state""",
+                (now - self.stale_after, now - self.ttl),
+            ).fetchall()
+        return dict(rows)
+
+
+class JobQueue:
+    """
+    Bounded queue of jobs drained by `workers` asyncio tasks, each running
+    handler(payload, progress) for one job at a time. submit() raises QueueFull
+    with a Retry-After estimate once max_queued jobs are waiting. stop() fails
+    the jobs still waiting; a heartbeat task keeps this process's queued and
+    running jobs from being reported stale. Every JobStore write runs on one
+    writer thread, in the order it was issued, so the event loop never waits
+    on SQLite.
+    """
+
+    def __init__(self, store: JobStore, handler: Callable[[Dict[str, Any], Progress], Awaitable[Any]],
+                 workers: int = JOB_WORKERS, max_queued: int = MAX_QUEUED_JOBS):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.avg_seconds = 30.0  # moving average of job run time, for Retry-After
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._live: set[str] = set()  # ids of this process's queued and running jobs
+        self._writer: ThreadPoolExecutor | None = None
+
+    def start(self) -> None:
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs still waiting will never run in this process: fail them now
+        # rather than leaving them "queued" until they go stale
+        while self._queue is not None and not self._queue.empty():
+            job_id, _ = self._queue.get_nowait()
+            self._write(self.store.update, job_id, "failed", error={"status_code": 503, "detail": "Server shut down"})
+            self._live.discard(job_id)
+        JOB_QUEUE_DEPTH.set(self.depth())
+        if self._writer is not None:
+            # Let the pending writes land before the process exits
+            await asyncio.get_running_loop().run_in_executor(None, self._writer.shutdown)
+            self._writer = None
+
+    def _write(self, fn: Callable[..., None], *args, **kwargs) -> asyncio.Future:
+        """Queue a JobStore write on the writer thread; await the result only where the order matters to the caller."""
+        future = asyncio.get_running_loop().run_in_executor(self._writer, lambda: fn(*args, **kwargs))
+        future.add_done_callback(_log_write_error)
+        return future
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up: one job finishing on any worker."""
+        return max(1, math.ceil(self.avg_seconds / self.workers))
+
+    async def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self._queue is None:
+            raise RuntimeError("JobQueue.start() has not been called")
+        if self._queue.full():
+            JOBS.labels(outcome="rejected").inc()
+            raise QueueFull(self.retry_after())
+
+        job_id = uuid.uuid4().hex
+        # The row is written before any of the worker's updates (same writer
+        # thread); the job takes its queue slot now, before this await
+        created = self._write(self.store.create, job_id)
+        self._queue.put_nowait((job_id, payload))
+        self._live.add(job_id)
+        position = self.depth()
+        JOB_QUEUE_DEPTH.set(position)
+        JOBS.labels(outcome="queued").inc()
+        # Only answer once a poll can find the job
+        await created
+        return {"job_id": job_id, "status": "queued", "position": position}
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            self._write(self.store.touch, list(self._live))
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, payload = await self._queue.get()
+            JOB_QUEUE_DEPTH.set(self.depth())
+            try:
+                await self._run(job_id, payload)
+            finally:
+                self._live.discard(job_id)
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, payload: Dict[str, Any]) -> None:
+        trace = start_trace(job_id[:16])
+        t1 = time.perf_counter()
+
+        # Progress updates are fire-and-forget: the writer applies them in order
+        def progress(stage: str, **details) -> None:
+            self._write(self.store.update, job_id, "running", {"stage": stage, **details, **trace.as_dict()})
+
+        progress("started")
+        try:
+            result = await self.handler(payload, progress)
+        except asyncio.CancelledError:
+            # stop() waits for the writer, so this lands without being awaited here
+            self._write(self.store.update, job_id, "failed", error={"status_code": 503, "detail": "Server shut down"})
+            raise
+        except Exception as e:
+            error = {"status_code": getattr(e, "status_code", 500), "detail": str(getattr(e, "detail", e))}
+            await self._write(self.store.update, job_id, "failed", {"stage": "failed", **trace.as_dict()}, error=error)
+            JOBS.labels(outcome="failed").inc()
+        else:
+            await self._write(self.store.update, job_id, "done", {"stage": "done", **trace.as_dict()}, result=result)
+            JOBS.labels(outcome="done").inc()
+        self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * (time.perf_counter() - t1)
+
+
+def _log_write_error(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Job store write failed", exc_info=future.exception())
@@ -0,0 +1,106 @@
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple
+
+
+class KeywordHit(NamedTuple):
+    term: str            # ontology term, lowercased
+    start: int           # offsets into the original text
+    end: int
+    domains: List[str]   # every ontology domain the term belongs to
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _boundary(text: str, pos: int) -> bool:
+    """Regex \\b: word-ness differs on the two sides of pos (outside the text counts as non-word)."""
+    before = pos > 0 and _is_word(text[pos - 1])
+    after = pos < len(text) and _is_word(text[pos])
+    return before != after
+
+
+class KeywordMatcher:
+    """
+    Gate 1 keyword scan: an Aho-Corasick automaton over every ontology term.
+
+    One left-to-right pass finds all terms regardless of how many there are,
+    then keeps the same hits the old `\\b(?:longest|...|shortest)\\b` regex
+    would: case-insensitive, word-bounded, leftmost-longest, non-overlapping.
+    Unlike the old reverse index, a term shared by several domains ("store",
+    "log", "withdraw") reports all of them.
+    """
+
+    def __init__(self, keyword_domains: Dict[str, Iterable[str]]):
+        self.domains: Dict[str, List[str]] = {}
+        for term, domains in keyword_domains.items():
+            term = term.lower()
+            merged = set(self.domains.get(term, [])) | set(domains)
+            self.domains[term] = sorted(merged)
+
+        # --- Trie ---
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[List[str]] = [[]]
+        for term in self.domains:
+            state = 0
+            for ch in term:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(term)
+
+        # --- Failure links (BFS) ---
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    @classmethod
+    def from_ontology(cls, ontology: Dict[str, List[str]]) -> "KeywordMatcher":
+        keyword_domains: Dict[str, set] = {}
+        for domain, keywords in ontology.items():
+            for kw in keywords:
+                keyword_domains.setdefault(kw.lower(), set()).add(domain)
+        return cls(keyword_domains)
+
+    def _candidates(self, text: str, lowered: str) -> List[tuple]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found = []
+        state = 0
+        for i, ch in enumerate(lowered):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                end = i + 1
+                for term in out[state]:
+                    start = end - len(term)
+                    if _boundary(text, start) and _boundary(text, end):
+                        found.append((start, end, term))
+        return found
+
+    def find(self, text: str) -> List[KeywordHit]:
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Rare characters whose lowercase is longer ("İ"): keep offsets aligned
+            lowered = "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+        # Leftmost-longest, non-overlapping: what the sorted regex alternation returned
+        hits = []
+        pos = 0
+        for start, end, term in sorted(self._candidates(text, lowered), key=lambda c: (c[0], c[0] - c[1])):
+            if start >= pos:
+                hits.append(KeywordHit(term, start, end, self.domains[term]))
+                pos = end
+        return hits
@@ -1,7 +1,10 @@
 from backend.filter import RelevanceFilter
 from backend.matcher import find_violations
 from backend.inference import run_inference
-import json, time
+from backend.telemetry import configure_logging
+import json, logging, time
+
+logger = logging.getLogger("backend.main")  # also when run as a script
 
 legal_filter = RelevanceFilter()
 
@@ -11,8 +14,7 @@ def pipeline(text: str) -> dict:
         start = time.time()
         clean_chunks = legal_filter.process_document(text)
         
-        print(f"Done in {time.time() - start:.2f}s")
-        print(f"Extracted {len(clean_chunks)} valid legal clauses.")
+        logger.info("Filtered in %.2fs: %d valid legal clauses", time.time() - start, len(clean_chunks))
         
         if not clean_chunks:
             return {"success": False, "error": "No valid legal clauses found"}
@@ -21,31 +23,33 @@ def pipeline(text: str) -> dict:
         accepted_matches = find_violations(clean_chunks)
         t2 = time.time()
         
-        print(f"Total Pipeline Time: {t2 - t1:.4f} seconds")
-        print(f"Accepted Matches: {len(accepted_matches)}")
+        logger.info("Matched in %.4fs: %d accepted matches", t2 - t1, len(accepted_matches))
         
         if not accepted_matches:
             return {"success": True, "data": None, "message": "No potential violations found"}
         
-        print(json.dumps(accepted_matches, indent=2))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Accepted matches:\n%s", json.dumps(accepted_matches, indent=2))
         
         result = run_inference(accepted_matches)
         
         if "error" in result:
-            print(f"Inference error: {result['error']}")
+            logger.error("Inference error: %s", result['error'])
             return {"success": False, "error": result["error"]}
         
-        print(result)
+        logger.debug("Inference result: %s", result)
         return {"success": True, "data": result, "matches": accepted_matches}
     
     except Exception as e:
-        print(f"Pipeline error: {e}")
+        logger.exception("Pipeline error: %s", e)
         return {"success": False, "error": str(e)}
 
 
 if __name__ == "__main__":
     from pathlib import Path
     
+    configure_logging("INFO")  # "DEBUG" also dumps the matches and raw LLM result
+    
     text_file = Path(__file__).parent / "text.txt"
     with open(text_file, "r") as f:
         raw_text = f.read()
@@ -1,9 +1,19 @@
-import spacy, time
+import spacy, time, hashlib, logging
+import numpy as np
 from pathlib import Path
 from typing import Dict, Any, List
 import chromadb
-from sentence_transformers import SentenceTransformer
 from chromadb.errors import InvalidArgumentError
+from backend.distill import distill_tokens
+from backend.cache import MemoCache, model_version, text_hash
+from backend.retriever import MatrixRetriever
+from backend.models import registry
+from backend.runtime import load_embedder
+from backend.telemetry import MATCHES_PER_DOCUMENT, stage
+
+logger = logging.getLogger(__name__)
+
+EMBEDDER_NAME = "BAAI/bge-small-en-v1.5"
 
 def project_paths() -> Dict[str, Path]:
     """Resolve key project paths using pathlib, independent of CWD."""
@@ -11,45 +21,215 @@ def project_paths() -> Dict[str, Path]:
     root = here.parent.parent  # AttorneysInRAGs/
     db_json = root / "backend" / "database" / "db.json"
     chroma_dir = root / "backend" / "database" / "chroma_db"
-    return {"root": root, "db_json": db_json, "chroma_dir": chroma_dir}
+    index_dir = root / "backend" / "database" / "rule_index"
+    return {"root": root, "db_json": db_json, "chroma_dir": chroma_dir, "index_dir": index_dir}
 
 
-# init
-nlp = spacy.load("en_core_web_sm")
-embedder_model = SentenceTransformer("BAAI/bge-small-en-v1.5")
-# Ensure we use the PersistentClient to access the DB created in previous steps
 paths = project_paths()
-client = chromadb.PersistentClient(path=str(paths["chroma_dir"]))
-collection = client.get_collection(name="policies")
 
-# Words that change legal meaning - NEVER remove these
-LEGAL_OPERATORS = {"not", "no", "never", "only", "unless", "except", "if", "then"}
+# Rule retrieval backend: "chroma" (HNSW via the PersistentClient), "matrix"
+# (exact cosine over the memory-mapped .npy written by db_generator.py), or
+# "auto" to use the matrix whenever that artifact exists.
+RETRIEVER = "auto"
+USE_MATRIX = RETRIEVER == "matrix" or (RETRIEVER == "auto" and MatrixRetriever.exists(paths["index_dir"]))
+
+# init
+# Nothing is loaded at import: models live in the shared registry
+# (backend/models.py) and load on first use or during the API's warm-up.
+def load_collection():
+    # Ensure we use the PersistentClient to access the DB created in previous steps
+    client = chromadb.PersistentClient(path=str(paths["chroma_dir"]))
+    return client.get_collection(name="policies")
+
+registry.register(
+    "embedder",
+    lambda: load_embedder(EMBEDDER_NAME),  # SentenceTransformer, or its ONNX export (backend/runtime.py)
+    warmup=lambda model: model.encode(["warm up the embedder"], normalize_embeddings=True),
+)
+if USE_MATRIX:
+    registry.register(
+        "rule_matrix",
+        lambda: MatrixRetriever(paths["index_dir"]),
+        warmup=lambda retriever: retriever.top_k(np.ones((1, retriever.embeddings.shape[1]), dtype=np.float32)),
+    )
+else:
+    registry.register("chroma", load_collection, warmup=lambda collection: collection.count())
+
+def get_embedder():
+    return registry.get("embedder")
+
+def get_collection():
+    # Also reachable with the matrix retriever active (benchmarks), hence the late register
+    registry.register("chroma", load_collection, warmup=lambda collection: collection.count())
+    return registry.get("chroma")
+
+def get_matrix_retriever() -> MatrixRetriever | None:
+    return registry.get("rule_matrix") if USE_MATRIX else None
+
+_embedding_cache = None
+
+def get_embedding_cache() -> MemoCache:
+    # Normalized float32 embeddings per distilled text. Pass disk_path=MEMO_DISK_PATH
+    # (backend.cache) to keep them across restarts.
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = MemoCache(
+            "embeddings",
+            model_version(EMBEDDER_NAME, get_embedder()),
+            max_entries=50_000,
+            encode=lambda v: v.tobytes(),
+            decode=lambda b: np.frombuffer(b, dtype=np.float32),
+            sizeof=lambda v: v.nbytes,
+        )
+    return _embedding_cache
+
+# Search each sentence only against the rules of the domains RelevanceFilter
+# detected for it, instead of all rules.
+DOMAIN_PARTITIONED = True
+
+def domain_flag(domain: str) -> str:
+    """Boolean metadata key db_generator.py writes for each domain of a rule."""
+    return f"in_{domain}"
+
+_chroma_flags = None
+
+def chroma_has_domain_flags() -> bool:
+    """
+    Whether the Chroma index was built with the per-domain flags. Indexes
+    generated before db_generator.py wrote them would otherwise cost one empty
+    filtered query per domain set plus the full fallback on every request.
+    """
+    global _chroma_flags
+    if _chroma_flags is None:
+        sample = get_collection().get(limit=1, include=["metadatas"])
+        metadatas = sample.get("metadatas") or []
+        _chroma_flags = any(key.startswith("in_") for meta in metadatas for key in (meta or {}))
+        if not _chroma_flags:
+            logger.warning("Chroma index has no domain flags; searching all rules. "
+                           "Rebuild it with experimentation/db_generator.py to enable domain partitioning.")
+    return _chroma_flags
+
+def _query_chroma_by_domains(embeddings, domains: List[List[str]], n_results: int) -> Dict[str, Any]:
+    """
+    Chroma stores the domains as one comma-joined string, so partitions are
+    expressed as per-domain boolean flags and one filtered query is issued per
+    distinct domain set. Sentences whose filtered query finds nothing (no
+    domains, or an index built before the flags existed) use the full index.
+    """
+    embeddings = np.asarray(embeddings).tolist()
+    groups: Dict[frozenset, List[int]] = {}
+    for i, ds in enumerate(domains):
+        groups.setdefault(frozenset(d.upper() for d in ds), []).append(i)
+
+    merged = {key: [None] * len(embeddings) for key in ("ids", "distances", "metadatas", "documents")}
+    fallback = []
+    for domain_set, idxs in groups.items():
+        if not domain_set:
+            fallback.extend(idxs)
+            continue
+        flags = [{domain_flag(d): True} for d in sorted(domain_set)]
+        where = flags[0] if len(flags) == 1 else {"$or": flags}
+        try:
+            res = get_collection().query(query_embeddings=[embeddings[i] for i in idxs], n_results=n_results, where=where)
+        except InvalidArgumentError:
+            fallback.extend(idxs)
+            continue
+        for pos, i in enumerate(idxs):
+            if not res["ids"][pos]:
+                fallback.append(i)
+                continue
+            for key in merged:
+                merged[key][i] = res[key][pos]
+
+    if fallback:
+        res = get_collection().query(query_embeddings=[embeddings[i] for i in fallback], n_results=n_results)
+        for pos, i in enumerate(fallback):
+            for key in merged:
+                merged[key][i] = res[key][pos]
+    return merged
+
+def query_rules(embeddings, n_results: int = 1, domains: List[List[str]] | None = None) -> Dict[str, Any]:
+    """
+    collection.query()-shaped results from whichever retriever is active.
+    With domains (one list per embedding) each query only searches the rules
+    in those domains.
+    """
+    matrix_retriever = get_matrix_retriever()
+    if matrix_retriever is not None:
+        if domains is not None:
+            return matrix_retriever.query_by_domains(embeddings, domains, n_results=n_results)
+        return matrix_retriever.query(embeddings, n_results=n_results)
+    if domains is not None and chroma_has_domain_flags():
+        return _query_chroma_by_domains(embeddings, domains, n_results)
+    return get_collection().query(query_embeddings=np.asarray(embeddings).tolist(), n_results=n_results)
+
+def retrieval_version() -> str:
+    """
+    Which retriever answers query_rules and whether it searches by domain.
+    Both change which rules a sentence matches, so they are part of the
+    response cache key. Opens the Chroma collection if that is the retriever.
+    """
+    if USE_MATRIX:
+        return f"matrix|{'domains' if DOMAIN_PARTITIONED else 'all'}"
+    return f"chroma|{'domains' if DOMAIN_PARTITIONED and chroma_has_domain_flags() else 'all'}"
+
+_rule_index_version = (None, None)
+
+def rule_index_version() -> str:
+    """
+    Short content hash of db.json, which the Chroma index is generated from.
+    Re-hashed only when the file's mtime/size change.
+    """
+    global _rule_index_version
+    stat = paths["db_json"].stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if _rule_index_version[0] != stamp:
+        digest = hashlib.sha256(paths["db_json"].read_bytes()).hexdigest()[:16]
+        _rule_index_version = (stamp, digest)
+    return _rule_index_version[1]
+
+def get_nlp():
+    """
+    spaCy is only needed for chunks that arrive without "distilled" metadata.
+    Reuse the filter's pipeline (it keeps the tagger + lemmatizer) rather than
+    loading a second copy; load a tagger-only one if no filter exists.
+    """
+    for name in registry.status():
+        if name.startswith("spacy:") and registry.is_loaded(name):
+            return registry.get(name)
+    registry.register("spacy:tagger", lambda: spacy.load("en_core_web_sm", disable=["ner", "parser"]), required=False)
+    return registry.get("spacy:tagger")
 
 def legal_distill(text: str) -> str:
-    doc = nlp(text)
-    clean_tokens = []
-    
-    for token in doc:
-        # Keep Numbers (for retention logic), Nouns, and Verbs
-        if token.pos_ in ["NOUN", "PROPN", "VERB", "NUM"] or token.text.lower() in LEGAL_OPERATORS:
-            if token.lemma_.lower() not in ["be", "have", "occur", "apply"]:
-                clean_tokens.append(token.lemma_.lower())
-    
-    # Deduplicate while preserving order
-    seen = set()
-    final_tokens = []
-    for t in clean_tokens:
-        if t in LEGAL_OPERATORS or t not in seen:
-            final_tokens.append(t)
-            seen.add(t)
-            
-    return " ".join(final_tokens)
+    return distill_tokens(get_nlp()(text))
 
-def build_embeddings(model: SentenceTransformer, texts: list[str]) -> list[list[float]]:
+def legal_distill_batch(texts: List[str], batch_size: int = 64) -> List[str]:
+    """Distill many sentences with a single nlp.pipe pass."""
+    return [distill_tokens(doc) for doc in get_nlp().pipe(texts, batch_size=batch_size)]
+
+def build_embeddings(model, texts: list[str]) -> list[list[float]]:
     """Encode texts to 384-dim normalized embeddings for cosine similarity."""
     # Normalize embeddings for cosine: improves recall and consistency
     return model.encode(texts, normalize_embeddings=True).tolist()
 
+def embed_cached(texts: List[str]) -> np.ndarray:
+    """build_embeddings through embedding_cache: only unseen distilled texts are encoded."""
+    embedder_model = get_embedder()
+    if not texts:
+        return np.zeros((0, embedder_model.get_sentence_embedding_dimension()), dtype=np.float32)
+    embedding_cache = get_embedding_cache()
+    keys = [text_hash(t) for t in texts]
+    known = embedding_cache.get_many(keys)
+
+    todo = list({keys[i]: i for i in range(len(texts)) if keys[i] not in known}.values())
+    if todo:
+        encoded = embedder_model.encode([texts[i] for i in todo], normalize_embeddings=True).astype(np.float32)
+        fresh = {keys[i]: vec for i, vec in zip(todo, encoded)}
+        embedding_cache.put_many(fresh)
+        known.update(fresh)
+
+    return np.vstack([known[k] for k in keys])
+
 def process_matches(results: Dict[str, Any], original_texts: List[str], threshold: float = 0.40) -> List[Dict[str, Any]]:
     """
     Filters and formats ChromaDB query results.
@@ -100,6 +280,19 @@ def find_violations(original_sentences: List[Any]) -> List[Dict[str, Any]]:
     """
     Main pipeline function: Distill -> Embed -> Query -> Filter -> Format
     """
+    return find_violations_batch([original_sentences])[0]
+
+RESULT_KEYS = ("ids", "distances", "metadatas", "documents")
+
+def find_violations_batch(documents: List[List[Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    find_violations for several documents' chunks at once: the sentences of
+    every document are distilled, embedded and retrieved as one pool (one
+    vectorized retrieval pass), then the matches are split back per document.
+    """
+    pool = [item for chunks in documents for item in chunks]
+    if not pool:
+        return [[] for _ in documents]
 
     # modify format
     """
@@ -114,50 +307,61 @@ def find_violations(original_sentences: List[Any]) -> List[Dict[str, Any]]:
     TO
     sentences = ["sentences"] AND metadata = [{"domains": [...], "filter_reason": "..."}]
     """
-    sentences = [item["text"] for item in original_sentences]
-    metadata = [item["metadata"] for item in original_sentences]
-    original_sentences = sentences
-    # 1. Distill
-    distilled_sentences = [legal_distill(text) for text in original_sentences]
-    
-    # 2. Embed
-    embeddings = build_embeddings(embedder_model, distilled_sentences)
+    original_sentences = [item["text"] for item in pool]
+
+    # Chunks the filter marked as (near) duplicates of an earlier clause in the
+    # same document reuse that clause's retrieval; only representatives are
+    # distilled, embedded and queried.
+    representative = []
+    start = 0
+    for chunks in documents:
+        for k, item in enumerate(chunks):
+            duplicate_of = item["metadata"].get("duplicate_of")
+            representative.append(start + duplicate_of if duplicate_of is not None and duplicate_of < k else start + k)
+        start += len(chunks)
+    reps = [p for p in range(len(pool)) if representative[p] == p]
+    row_of = {p: row for row, p in enumerate(reps)}
+
+    sentences = [original_sentences[p] for p in reps]
+    metadata = [pool[p]["metadata"] for p in reps]
+    # 1. Distill (reuse the filter's parse; bulk-distill whatever arrived without it)
+    distilled_sentences = [meta.get("distilled") for meta in metadata]
+    missing = [i for i, d in enumerate(distilled_sentences) if d is None]
+    if missing:
+        with stage("distill"):
+            for i, d in zip(missing, legal_distill_batch([sentences[i] for i in missing])):
+                distilled_sentences[i] = d
     
-    # 3. Query (Fetch top 2 to check against threshold)
-
-    # FAIL ATTEMPT AT DOMAIN MATCHING. NEED TO REBUILD DATABASE WITH DUPLICATE DB
-
-    # We query MORE than 1 (n_results=2) to handle cases where two different laws might apply,
-    # but the threshold will ensure we don't return garbage.
-    # Assuming 'detected_domains' is a list like ["DATA_RETENTION", "LOGGING_AUDIT"]
-    # Flatten domains and build a permissive where clause.
-    # detected_domain_lists = [item.get("domains", []) for item in metadata]
-    # flat_domains = sorted({d for lst in detected_domain_lists for d in lst if isinstance(d, str) and d})
-
-    # # Attempt metadata prefilter; if rejected by Chroma, fallback to no filter.
-    # if flat_domains:
-    #     # Use supported operator $in for exact matches on single-domain records
-    #     where_clause = {"domain": {"$in": flat_domains}}
-    #     raw_results = collection.query(
-    #         query_embeddings=embeddings,
-    #         n_results=2,
-    #         where=where_clause,
-    #     )
-    # else:
-    #     raw_results = collection.query(
-    #         query_embeddings=embeddings,
-    #         n_results=2,
-    #     )
+    # 2. Embed (memoized per distilled text)
+    with stage("embedding"):
+        embeddings = embed_cached(distilled_sentences)
     
-    raw_results = collection.query(
-        query_embeddings=embeddings,
-        n_results=1,
-    )
+    # 3. Query, restricted to the rules of each sentence's detected domains
+    # (full index for sentences without a domain that has rules)
+    domains = [meta.get("domains", []) for meta in metadata] if DOMAIN_PARTITIONED else None
+    with stage("retrieval"):
+        rep_results = query_rules(embeddings, n_results=1, domains=domains)
+    # Fan the representatives' rows back out to every occurrence
+    raw_results = {key: [rep_results[key][row_of[representative[p]]] for p in range(len(pool))] for key in RESULT_KEYS}
 
-    # 4. Process & Filter
-    matches = process_matches(raw_results, original_sentences, threshold=0.40)
+    # 4. Process & Filter, per document (results are one row per query sentence)
+    per_document = []
+    start = 0
+    with stage("process_matches"):
+        for chunks in documents:
+            end = start + len(chunks)
+            rows = {key: raw_results[key][start:end] for key in RESULT_KEYS}
+            matches = process_matches(rows, original_sentences[start:end], threshold=0.40)
+            # Tag copies with the clause they duplicate, so the LLM judges each group once
+            canonical = {original_sentences[p]: original_sentences[representative[p]] for p in range(start, end)}
+            for match in matches:
+                if canonical.get(match["TOS_text"], match["TOS_text"]) != match["TOS_text"]:
+                    match["duplicate_of"] = canonical[match["TOS_text"]]
+            MATCHES_PER_DOCUMENT.observe(len(matches))
+            per_document.append(matches)
+            start = end
     
-    return matches
+    return per_document
 
 
 # --- TEST ---
@@ -165,7 +369,7 @@ if __name__ == "__main__":
     tos_1 = "If a transfer of any Customer Data from Salesforce to Supplier occurs in connection with the Licensed Software then, notwithstanding anything to the contrary, Section 3(v) of these Software Terms shall apply."
     tos_2 = "Supplier will deliver the most current version of the Licensed Software to Salesforce via electronic delivery or load-and-leave services, and will not deliver tangible materials to Salesforce without Salesforce’s advance written consent"
 
-    input_sentences = [tos_1, tos_2]
+    input_sentences = [{"text": tos, "metadata": {}} for tos in (tos_1, tos_2)]
 
     t1 = time.time()
     
@@ -0,0 +1,128 @@
+import os, threading, time
+from typing import Any, Callable, Dict
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # peak, KiB on Linux
+
+
+class ModelLoadError(RuntimeError):
+    pass
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of the heavy models (spaCy, distilbart, bge-small,
+    the rule index). Each is registered with a loader and loaded at most once:
+    lazily on first get(), or ahead of time by warm_up() / start_warmup().
+
+    Loads are serialized, so the RSS growth measured around a loader is a fair
+    estimate of that model's resident memory. A model whose loader failed is
+    not retried; get() raises ModelLoadError for it.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._warmups: Dict[str, Callable[[Any], Any] | None] = {}
+        self._required: Dict[str, bool] = {}
+        self._models: Dict[str, Any] = {}
+        self._info: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._warmup_thread: threading.Thread | None = None
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: Callable[[Any], Any] | None = None,
+                 required: bool = True) -> None:
+        """Add a model; registering an existing name again is a no-op."""
+        with self._lock:
+            if name in self._loaders:
+                return
+            self._loaders[name] = loader
+            self._warmups[name] = warmup
+            self._required[name] = required
+            self._info[name] = {"state": "registered", "required": required}
+
+    def get(self, name: str) -> Any:
+        if name in self._models:
+            return self._models[name]
+
+        with self._lock:
+            if name in self._models:
+                return self._models[name]
+            if name not in self._loaders:
+                raise KeyError(f"Model '{name}' is not registered")
+            info = self._info[name]
+            if info["state"] == "failed":
+                raise ModelLoadError(f"Model '{name}' failed to load: {info['error']}")
+
+            info["state"] = "loading"
+            rss_before = current_rss()
+            t1 = time.time()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                info.update(state="failed", error=str(e), load_seconds=round(time.time() - t1, 3))
+                raise ModelLoadError(f"Model '{name}' failed to load: {e}") from e
+
+            info.update(
+                state="loaded",
+                load_seconds=round(time.time() - t1, 3),
+                rss_bytes=max(0, current_rss() - rss_before),
+            )
+            backend = getattr(model, "inference_backend", None)  # see backend/runtime.py
+            if backend:
+                info["backend"] = backend
+            self._models[name] = model
+            return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warm_up(self) -> None:
+        """Load every registered model and run its warm-up call on a dummy batch."""
+        for name in list(self._loaders):
+            try:
+                model = self.get(name)
+            except ModelLoadError:
+                continue
+            warmup = self._warmups.get(name)
+            info = self._info[name]
+            if warmup is None or info.get("warm"):
+                info["warm"] = True
+                continue
+            t1 = time.time()
+            try:
+                warmup(model)
+                info["warm"] = True
+            except Exception as e:
+                info["warmup_error"] = str(e)
+            info["warmup_seconds"] = round(time.time() - t1, 3)
+
+    def start_warmup(self) -> threading.Thread:
+        """Run warm_up() on a daemon thread so the server can start accepting requests."""
+        with self._lock:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(target=self.warm_up, name="model-warmup", daemon=True)
+                self._warmup_thread.start()
+            return self._warmup_thread
+
+    def ready(self) -> bool:
+        """All required models loaded and warmed; optional ones at least attempted."""
+        for name, info in self._info.items():
+            if self._required[name]:
+                if info["state"] != "loaded" or not info.get("warm"):
+                    return False
+            elif info["state"] not in ("loaded", "failed"):
+                return False
+        return True
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: dict(info) for name, info in self._info.items()}
+
+
+registry = ModelRegistry()
@@ -0,0 +1,133 @@
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+RULES_FILE = "rules.json"
+
+
+def parse_domains(domain: Any) -> List[str]:
+    """Rule domains as a clean upper-case list, whether stored as a list or a comma-joined string."""
+    if isinstance(domain, str):
+        domain = domain.split(",")
+    return [str(d).strip().upper() for d in (domain or []) if str(d).strip()]
+
+
+class MatrixRetriever:
+    """
+    Exact cosine retrieval over the rule rationales, without Chroma.
+
+    Loads the artifacts written by experimentation/db_generator.py:
+      embeddings.npy - (n_rules, dim) float32, L2-normalized, memory-mapped so
+                       every worker process shares the same pages
+      rules.json     - {"ids", "documents", "metadatas"} in the same row order,
+                       with metadata in the same format as the Chroma collection
+
+    query() scores a whole batch of sentences with one matrix multiply and
+    returns the same dict shape as collection.query(), so process_matches
+    works unchanged. query_by_domains() searches each sentence only against
+    the rules of its detected domains (every rule is listed under each of its
+    domains), falling back to the full index when there is no such partition.
+    """
+
+    def __init__(self, index_dir: Path):
+        index_dir = Path(index_dir)
+        self.embeddings = np.load(index_dir / EMBEDDINGS_FILE, mmap_mode="r")
+        with (index_dir / RULES_FILE).open("r", encoding="utf-8") as f:
+            rules = json.load(f)
+        self.ids: List[str] = rules["ids"]
+        self.documents: List[str] = rules["documents"]
+        self.metadatas: List[Dict[str, Any]] = rules["metadatas"]
+
+        if len(self.ids) != self.embeddings.shape[0]:
+            raise ValueError(
+                f"Rule index mismatch: {len(self.ids)} rules but {self.embeddings.shape[0]} embeddings in {index_dir}"
+            )
+
+        # --- Domain partitions: domain -> row indices of its rules ---
+        partitions = defaultdict(list)
+        for row, metadata in enumerate(self.metadatas):
+            for domain in parse_domains(metadata.get("domain")):
+                partitions[domain].append(row)
+        self.partitions = {d: np.asarray(rows, dtype=np.int64) for d, rows in partitions.items()}
+
+    @staticmethod
+    def exists(index_dir: Path) -> bool:
+        return (Path(index_dir) / EMBEDDINGS_FILE).exists() and (Path(index_dir) / RULES_FILE).exists()
+
+    def partition_rows(self, domains: Iterable[str]) -> np.ndarray | None:
+        """Sorted union of the rows for these domains, or None if none of them has rules."""
+        parts = [self.partitions[d] for d in {str(d).upper() for d in domains} if d in self.partitions]
+        if not parts:
+            return None
+        return np.unique(np.concatenate(parts))
+
+    def top_k(self, query_embeddings, n_results: int = 1, rows: np.ndarray | None = None):
+        """
+        Return (row indices, cosine distances), both (n_queries, k), best first.
+        rows optionally restricts the search to a subset of rule rows.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        # Queries are normalized by build_embeddings; normalize again so raw vectors work too
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1.0, norms)
+
+        matrix = self.embeddings if rows is None else self.embeddings[rows]
+        k = min(n_results, matrix.shape[0])
+        if k == 0 or queries.shape[0] == 0:
+            empty = np.zeros((queries.shape[0], 0))
+            return empty.astype(np.int64), empty
+
+        # One multiply for the whole batch: (n_queries, dim) @ (dim, n_rules)
+        distances = 1.0 - queries @ matrix.T
+
+        if k < matrix.shape[0]:
+            part = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            part = np.tile(np.arange(matrix.shape[0]), (queries.shape[0], 1))
+        part_dist = np.take_along_axis(distances, part, axis=1)
+        order = np.argsort(part_dist, axis=1, kind="stable")
+        best = np.take_along_axis(part, order, axis=1)
+        best_dist = np.take_along_axis(part_dist, order, axis=1)
+
+        if rows is not None:
+            best = np.asarray(rows)[best]
+        return best, best_dist
+
+    def format_results(self, best, best_dist) -> Dict[str, List[List[Any]]]:
+        """Chroma collection.query()-shaped results for top_k() output."""
+        return {
+            "ids": [[self.ids[j] for j in row] for row in best],
+            "distances": [[float(d) for d in row] for row in best_dist],
+            "metadatas": [[self.metadatas[j] for j in row] for row in best],
+            "documents": [[self.documents[j] for j in row] for row in best],
+        }
+
+    def query(self, query_embeddings, n_results: int = 1) -> Dict[str, List[List[Any]]]:
+        return self.format_results(*self.top_k(query_embeddings, n_results))
+
+    def query_by_domains(self, query_embeddings, domains: List[List[str]], n_results: int = 1) -> Dict[str, List[List[Any]]]:
+        """
+        Like query(), but query i only searches the partitions for domains[i].
+        Queries with the same domain set share one matrix multiply.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        groups = defaultdict(list)
+        for i in range(queries.shape[0]):
+            groups[frozenset(str(d).upper() for d in (domains[i] if i < len(domains) else []))].append(i)
+
+        best_rows: List[Any] = [None] * queries.shape[0]
+        best_dists: List[Any] = [None] * queries.shape[0]
+        for domain_set, idxs in groups.items():
+            rows = self.partition_rows(domain_set)  # None -> full index
+            best, best_dist = self.top_k(queries[idxs], n_results, rows)
+            for pos, i in enumerate(idxs):
+                best_rows[i] = best[pos]
+                best_dists[i] = best_dist[pos]
+
+        return self.format_results(best_rows, best_dists)
@@ -0,0 +1,228 @@
+import json, os
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Inference backends for the two transformer models, the Gate 2 zero-shot
+# classifier and the bge-small embedder:
+#   torch-cpu  - transformers / sentence-transformers on the CPU
+#   torch-cuda - same, on the first GPU
+#   onnx       - ONNX Runtime, fp32 export
+#   onnx-int8  - ONNX Runtime, dynamically quantized int8 weights
+# "auto" picks torch-cuda when a GPU is visible, else the fp32 ONNX export if
+# it has been written by experimentation/export_onnx.py, else torch-cpu. An
+# explicitly requested backend that is not available fails the load (visible
+# in /readyz) instead of silently falling back.
+BACKENDS = ("torch-cpu", "torch-cuda", "onnx", "onnx-int8")
+INFERENCE_BACKEND = "auto"
+
+ONNX_DIR = Path(__file__).resolve().parent / "database" / "onnx"
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+SOURCE_FILE = "source.json"  # {"model": hub name, "commit": hub revision} of the export
+
+# Intra-op threads of each ONNX Runtime session; 0 lets ORT pick (one per core).
+# A session with 1 thread has no thread pool, so it stays usable after fork():
+# serve.py sets this before preloading, and its workers then share the
+# master's session (and weights) copy-on-write instead of reloading the model.
+ONNX_THREADS = 0
+
+
+def cuda_available() -> bool:
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+
+def onnx_available() -> bool:
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def onnx_export_dir(model_name: str) -> Path:
+    """Where export_onnx.py writes a model: backend/database/onnx/<org>--<name>/"""
+    return ONNX_DIR / model_name.replace("/", "--")
+
+
+def resolve_backend(model_name: str, requested: str | None = None) -> str:
+    requested = requested or INFERENCE_BACKEND
+    if requested == "auto":
+        if cuda_available():
+            return "torch-cuda"
+        if onnx_available() and (onnx_export_dir(model_name) / ONNX_FILES["onnx"]).exists():
+            return "onnx"
+        return "torch-cpu"
+
+    if requested not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{requested}', expected 'auto' or one of {BACKENDS}")
+    if requested == "torch-cuda" and not cuda_available():
+        raise RuntimeError("Inference backend 'torch-cuda' requested but no CUDA device is available")
+    if requested in ONNX_FILES:
+        if not onnx_available():
+            raise RuntimeError(f"Inference backend '{requested}' requested but onnxruntime is not installed")
+        path = onnx_export_dir(model_name) / ONNX_FILES[requested]
+        if not path.exists():
+            raise FileNotFoundError(f"{path} not found; run experimentation/export_onnx.py first")
+    return requested
+
+
+class OnnxModel:
+    """
+    An exported model plus its tokenizer and config. A session with a thread
+    pool (ONNX_THREADS != 1) does not survive fork(), so it is rebuilt on first
+    use in a forked worker; a single-threaded one is inherited as is.
+    """
+
+    def __init__(self, model_name: str, backend: str):
+        from transformers import AutoConfig, AutoTokenizer
+
+        model_dir = onnx_export_dir(model_name)
+        self.path = model_dir / ONNX_FILES[backend]
+        self.inference_backend = backend
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.config = AutoConfig.from_pretrained(model_dir)
+
+        # Keep model_version() pointing at the hub revision the export came from
+        source = model_dir / SOURCE_FILE
+        if source.exists():
+            self.config._commit_hash = json.loads(source.read_text(encoding="utf-8")).get("commit")
+
+        self._session = None
+        self._session_pid = None
+        self._session_threads = None
+        self.session  # open it now so a broken export fails the load
+
+    @property
+    def session(self):
+        forked = self._session_pid != os.getpid() and self._session_threads != 1
+        if self._session is None or forked:
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if ONNX_THREADS:
+                options.intra_op_num_threads = ONNX_THREADS
+                options.inter_op_num_threads = 1
+                options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            providers = ["CPUExecutionProvider"]
+            if "CUDAExecutionProvider" in ort.get_available_providers() and cuda_available():
+                providers.insert(0, "CUDAExecutionProvider")
+            self._session = ort.InferenceSession(str(self.path), options, providers=providers)
+            self._session_pid = os.getpid()
+            self._session_threads = ONNX_THREADS
+            self._input_names = {i.name for i in self._session.get_inputs()}
+        return self._session
+
+    def run(self, encoded: Dict[str, np.ndarray]) -> np.ndarray:
+        session = self.session
+        feeds = {k: v.astype(np.int64) for k, v in encoded.items() if k in self._input_names}
+        return session.run(None, feeds)[0]
+
+
+class OnnxEmbedder(OnnxModel):
+    """The part of the SentenceTransformer interface the matcher uses, over the bge-small export."""
+
+    max_seq_length = 512
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config.hidden_size
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        out = np.zeros((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                     max_length=self.max_seq_length, return_tensors="np")
+            hidden = self.run(encoded)
+            out[start:start + batch_size] = hidden[:, 0]  # bge uses CLS pooling
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            out = out / np.where(norms == 0, 1.0, norms)
+        return out[0] if single else out
+
+
+class OnnxZeroShotClassifier(OnnxModel):
+    """
+    Same call and output format as transformers' zero-shot-classification
+    pipeline, over the exported NLI model: every (sentence, hypothesis) pair
+    is scored, and the entailment logits are softmaxed across the labels.
+    """
+
+    def __init__(self, model_name: str, backend: str):
+        super().__init__(model_name, backend)
+        label2id = {k.lower(): v for k, v in self.config.label2id.items()}
+        self.entailment_id = next(v for k, v in label2id.items() if k.startswith("entail"))
+        self.contradiction_id = next(v for k, v in label2id.items() if k.startswith("contra"))
+
+    def __call__(self, sequences, candidate_labels: List[str], hypothesis_template: str = "This example is {}.",
+                 multi_label: bool = False, batch_size: int = 8, **kwargs):
+        single = isinstance(sequences, str)
+        texts = [sequences] if single else list(sequences)
+        if isinstance(candidate_labels, str):
+            candidate_labels = [candidate_labels]
+        hypotheses = [hypothesis_template.format(label) for label in candidate_labels]
+
+        premises = [t for t in texts for _ in hypotheses]
+        pairs = [h for _ in texts for h in hypotheses]
+        step = max(1, batch_size) * len(hypotheses)
+        logits = []
+        for start in range(0, len(premises), step):
+            encoded = self.tokenizer(premises[start:start + step], pairs[start:start + step], padding=True,
+                                     truncation="only_first", return_tensors="np")
+            logits.append(self.run(encoded))
+        logits = np.concatenate(logits).reshape(len(texts), len(hypotheses), -1)
+
+        if multi_label or len(hypotheses) == 1:
+            pair = logits[..., [self.contradiction_id, self.entailment_id]]
+            scores = _softmax(pair, axis=-1)[..., 1]
+        else:
+            scores = _softmax(logits[..., self.entailment_id], axis=-1)
+
+        results = []
+        for text, row in zip(texts, scores):
+            order = np.argsort(-row, kind="stable")
+            results.append({
+                "sequence": text,
+                "labels": [candidate_labels[j] for j in order],
+                "scores": [float(row[j]) for j in order],
+            })
+        return results[0] if single else results
+
+
+def _softmax(x: np.ndarray, axis: int) -> np.ndarray:
+    e = np.exp(x - x.max(axis=axis, keepdims=True))
+    return e / e.sum(axis=axis, keepdims=True)
+
+
+def load_zero_shot(model_name: str, backend: str | None = None) -> Any:
+    backend = resolve_backend(model_name, backend)
+    if backend in ONNX_FILES:
+        return OnnxZeroShotClassifier(model_name, backend)
+
+    from transformers import pipeline
+    classifier = pipeline(
+        "zero-shot-classification",
+        model=model_name,
+        device=0 if backend == "torch-cuda" else -1,
+    )
+    classifier.inference_backend = backend
+    return classifier
+
+
+def load_embedder(model_name: str, backend: str | None = None) -> Any:
+    backend = resolve_backend(model_name, backend)
+    if backend in ONNX_FILES:
+        return OnnxEmbedder(model_name, backend)
+
+    from sentence_transformers import SentenceTransformer
+    embedder = SentenceTransformer(model_name, device="cuda" if backend == "torch-cuda" else "cpu")
+    embedder.inference_backend = backend
+    return embedder
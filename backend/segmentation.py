@@ -0,0 +1,175 @@
+import re
+from typing import Iterator, Tuple
+
+import spacy
+from spacy.language import Language
+
+# Engines RelevanceFilter can use to split a document into sentences:
+#   parser      - dependency parse (most accurate, slowest)
+#   sentencizer - spaCy's rule-based punctuation splitter
+#   legal       - punctuation + paragraph breaks and clause/heading lines, aware of legal abbreviations
+SEGMENTERS = ("parser", "sentencizer", "legal")
+
+TERMINALS = {".", "!", "?"}
+
+# Abbreviations whose trailing period does not end a sentence ("Sec. 43A", "Rule 3(1)")
+ABBREVIATIONS = {
+    "sec", "s", "ss", "art", "cl", "para", "paras", "r", "ch", "no", "nos", "vol", "pt",
+    "e.g", "i.e", "etc", "viz", "cf", "vs", "v", "inc", "ltd", "pvt", "co", "corp",
+    "mr", "mrs", "ms", "dr", "st", "approx", "fig", "u.s", "govt", "dept",
+}
+
+# Clause numbering at the start of a line: "1.", "3.2.", "(a)", "iv)", "(xii)"
+CLAUSE_MARKER = re.compile(r"^(?:\(?\d{1,3}(?:\.\d+)*[.)]?|\(?[a-z]\)|\(?[ivxlc]{1,5}\))$", re.IGNORECASE)
+
+# A line that opens a new unit by itself: numbered or lettered clause ("1.",
+# "3.2", "(a)", "iv)") or bullet. "Section 43A ..." is not one: wrapped text
+# often continues with a statute reference.
+LINE_OPENER = re.compile(r"(?:\(?\d{1,3}(?:\.\d+)+[.)]?|\(?\d{1,3}[.)]|\(?[a-z]\)|\(?[ivxlc]{1,5}\)|[-\u2022\u25aa*])\s", re.IGNORECASE)
+
+
+def _is_line_start(doc, i: int) -> bool:
+    return i == 0 or (doc[i - 1].is_space and "\n" in doc[i - 1].text)
+
+
+def _is_heading(line: str) -> bool:
+    """A short all-caps line or one ending in ':' ("DATA RETENTION", "We collect:")."""
+    line = line.strip()
+    return 0 < len(line) <= 80 and line[-1] not in TERMINALS and (line.isupper() or line.endswith(":"))
+
+
+def _is_block_start(doc, i: int) -> bool:
+    """
+    True if token i starts a line that begins a new sentence on its own: after
+    a blank line, or on a clause/bullet/heading line or the line after a
+    heading. Any other line break is a hard wrap inside the sentence.
+    """
+    if i == 0:
+        return True
+    if not _is_line_start(doc, i):
+        return False
+    if doc[i - 1].text.count("\n") >= 2:
+        return True
+    text = doc.text
+    start = doc[i].idx
+    end = text.find("\n", start)
+    line = text[start:end if end != -1 else len(text)]
+    before = text[:doc[i - 1].idx]
+    previous = before[before.rfind("\n") + 1:]
+    return bool(LINE_OPENER.match(line + " ")) or _is_heading(line) or _is_heading(previous)
+
+
+def _is_terminal(doc, i: int) -> bool:
+    """True if token i is a period/!/? that really ends a sentence."""
+    token = doc[i]
+    if token.text not in TERMINALS:
+        return False
+    if token.text != "." or i == 0:
+        return True
+
+    prev = doc[i - 1]
+    # "Sec." / "e.g." - the period is glued to an abbreviation
+    if not prev.whitespace_ and prev.text.lower() in ABBREVIATIONS:
+        return False
+    # "1." / "(a)." opening a numbered clause
+    if not prev.whitespace_ and _is_line_start(doc, i - 1) and CLAUSE_MARKER.match(prev.text):
+        return False
+    return True
+
+
+@Language.component("legal_sentencizer")
+def legal_sentencizer(doc):
+    """
+    Rule-based splitter for ToS / statute text. Breaks after terminal
+    punctuation, at blank lines, and before numbered clause, bullet and heading
+    lines; other line breaks are treated as hard wrapping, so a clause wrapped
+    over several lines stays one sentence. Keeps "Section 3(v)", "Sec. 43A"
+    and numbered clause markers ("1.", "(a)") inside the sentence they introduce.
+    """
+    seen_terminal = False
+    for i, token in enumerate(doc):
+        if i == 0:
+            token.is_sent_start = True
+            continue
+        if token.is_space:
+            token.is_sent_start = False
+            continue
+
+        # Closing quotes/brackets stay with the sentence they close
+        if seen_terminal and (token.is_punct and (token.is_quote or token.is_right_punct or token.text in TERMINALS)):
+            token.is_sent_start = False
+            continue
+
+        token.is_sent_start = seen_terminal or _is_block_start(doc, i)
+        seen_terminal = _is_terminal(doc, i)
+
+    return doc
+
+
+def load_pipeline(segmenter: str = "parser") -> Language:
+    """
+    Load en_core_web_sm for chunking + distillation with the chosen segmenter.
+    'ner' is always disabled; the tagger and lemmatizer stay on for legal_distill.
+    """
+    if segmenter not in SEGMENTERS:
+        raise ValueError(f"Unknown segmenter '{segmenter}', expected one of {SEGMENTERS}")
+
+    if segmenter == "parser":
+        nlp = spacy.load("en_core_web_sm", disable=["ner"])
+        # Ensure the sentencizer (sentence splitter) is active
+        if "sentencizer" not in nlp.pipe_names:
+            nlp.add_pipe("sentencizer")
+        return nlp
+
+    # The parser is the most expensive component; without it a rule-based
+    # component has to set the sentence boundaries.
+    nlp = spacy.load("en_core_web_sm", disable=["ner", "parser"])
+    nlp.add_pipe("sentencizer" if segmenter == "sentencizer" else "legal_sentencizer", first=True)
+    return nlp
+
+
+# --- Windowing for very large documents ---
+# Long texts are parsed as a stream of windows instead of one Doc, so memory
+# stays bounded and spaCy's max_length (1,000,000 chars) never applies.
+WINDOW_CHARS = 20_000
+
+# Preferred cut points, best first: a paragraph break, a line break, then the
+# space after a sentence terminal that is followed by a capital or a clause marker
+_CUTS = (
+    re.compile(r"\n[ \t]*\n"),
+    re.compile(r"\n"),
+    re.compile(r"(?<=[.!?][\"')\]])\s+(?=[A-Z(\d])|(?<=[.!?])\s+(?=[A-Z(\d])"),
+)
+
+
+def _cut_point(text: str, start: int, limit: int) -> int:
+    """Where to end the window text[start:limit]: after the last good boundary in its second half."""
+    floor = start + (limit - start) // 2
+    for pattern in _CUTS:
+        cut = None
+        for match in pattern.finditer(text, floor, limit):
+            cut = match.end()
+        if cut is not None:
+            return cut
+    # A run with no boundary at all: break on whitespace, or hard-cut as a last resort
+    space = text.rfind(" ", floor, limit)
+    return space + 1 if space > start else limit
+
+
+def iter_windows(text: str, max_chars: int = WINDOW_CHARS) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (offset, window) pieces of text, each at most max_chars long, cut at
+    paragraph breaks where possible and otherwise at line breaks or sentence
+    ends, so no sentence is split across two windows except in a run of
+    max_chars / 2 characters with no boundary at all.
+    """
+    start = 0
+    while start < len(text):
+        if len(text) - start <= max_chars:
+            end = len(text)
+        else:
+            end = _cut_point(text, start, start + max_chars)
+        window = text[start:end]
+        if window.strip():
+            yield start, window
+        start = end
@@ -0,0 +1,184 @@
+# Preload-then-fork server.
+#
+# `uvicorn backend.api:app --workers N` imports the app (and loads every model)
+# separately in each worker, so memory grows N-fold. Here the master process
+# loads and warms all models once, freezes them, binds the socket and then
+# forks N workers that serve from the inherited, copy-on-write pages.
+#
+#     python -m backend.serve --workers 4 --port 8000
+
+import argparse, gc, logging, os, signal, socket, sys, time
+
+import uvicorn
+
+from backend import runtime
+from backend.api import app
+from backend.models import registry
+from backend.telemetry import configure_logging
+
+# Named explicitly: run as `python -m backend.serve` __name__ is "__main__",
+# which configure_logging's "backend" level would not cover
+logger = logging.getLogger("backend.serve")
+
+
+def freeze_models() -> None:
+    """
+    Make the loaded weights read-only in practice before forking: eval mode,
+    no autograd state, and every live object moved out of the GC's reach so
+    collections in the workers do not write to (and so copy) shared pages.
+    """
+    try:
+        import torch
+    except ImportError:
+        torch = None
+
+    if torch is not None:
+        torch.set_grad_enabled(False)
+        for name in registry.status():
+            if not registry.is_loaded(name):
+                continue
+            model = registry.get(name)
+            # HF pipelines hold the module in .model; SentenceTransformer is one
+            module = getattr(model, "model", model)
+            if isinstance(module, torch.nn.Module):
+                module.eval()
+                for param in module.parameters():
+                    param.requires_grad_(False)
+
+    gc.collect()
+    gc.freeze()
+
+
+# A worker that dies within MIN_UPTIME seconds of starting counts as a rapid
+# failure. Each one in a row doubles the respawn delay (from BACKOFF_BASE up to
+# BACKOFF_MAX), and after MAX_RAPID_FAILURES the master gives up instead of
+# fork-looping on a crash at startup.
+MIN_UPTIME = 10.0
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+MAX_RAPID_FAILURES = 5
+
+
+def preload() -> None:
+    try:
+        import torch
+        # Warm up single-threaded: an OpenMP pool started in the master does not
+        # survive fork() and can hang the workers' first forward pass.
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+    t1 = time.time()
+    registry.warm_up()
+    if not registry.ready():
+        sys.exit(f"Models failed to load: {registry.status()}")
+    freeze_models()
+    logger.info("master %d: models loaded and frozen in %.1fs", os.getpid(), time.time() - t1)
+
+
+def run_worker(sock: socket.socket, torch_threads: int, log_level: str) -> None:
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(sock: socket.socket, torch_threads: int, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        try:
+            run_worker(sock, torch_threads, log_level)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the API from N workers that share one copy of the models.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--torch-threads", type=int, default=1, help="intra-op threads per worker (torch backends; ONNX runs single-threaded)")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--backend", default=runtime.INFERENCE_BACKEND, choices=("auto",) + runtime.BACKENDS,
+                        help="inference backend for the classifier and embedder")
+    args = parser.parse_args()
+
+    runtime.INFERENCE_BACKEND = args.backend  # read when the models load, in preload()
+    # Single-threaded ONNX sessions survive fork(), so workers keep the master's
+    # copy of the weights; parallelism comes from --workers instead
+    runtime.ONNX_THREADS = 1
+    configure_logging(args.log_level)
+
+    preload()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    workers = {spawn(sock, args.torch_threads, args.log_level): time.monotonic() for _ in range(args.workers)}
+    logger.info("master %d: serving on %s:%d with workers %s", os.getpid(), args.host, args.port, sorted(workers))
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Replace workers that die; they fork from the same preloaded master
+    rapid_failures = 0
+    while workers:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(pid)
+        if stopping or started is None:
+            continue
+
+        if time.monotonic() - started < MIN_UPTIME:
+            rapid_failures += 1
+        else:
+            rapid_failures = 0
+        if rapid_failures > MAX_RAPID_FAILURES:
+            logger.error("workers keep dying within %.0fs of starting; giving up", MIN_UPTIME)
+            stop(signal.SIGTERM, None)
+            for _ in list(workers):
+                try:
+                    os.wait()
+                except ChildProcessError:
+                    break
+            sys.exit(1)
+        if rapid_failures:
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (rapid_failures - 1))
+            logger.warning("worker %d died after %.1fs, respawning in %.1fs", pid, time.monotonic() - started, delay)
+            time.sleep(delay)
+            if stopping:
+                continue
+
+        new_pid = spawn(sock, args.torch_threads, args.log_level)
+        workers[new_pid] = time.monotonic()
+        logger.info("worker %d exited, started %d", pid, new_pid)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from backend.telemetry import COALESCED
+
+# In-flight request coalescing. When many clients submit the same policy at
+# once (a popular site's ToS), the first caller runs the work and the others
+# await its result instead of repeating it. The work runs in its own task, so
+# a caller that goes away (client disconnect, cancelled job) never cancels it
+# for the others still waiting.
+
+
+class SingleFlight:
+    """At most one running call per key; concurrent callers of do() for the same key share its result."""
+
+    def __init__(self, level: str):
+        self.level = level
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            COALESCED.labels(level=self.level, role="leader").inc()
+        else:
+            COALESCED.labels(level=self.level, role="waiter").inc()
+        # shield: cancelling this caller must not cancel the shared task
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Every caller may have gone away; retrieve the exception so it is not logged as unhandled
+        if not task.cancelled():
+            task.exception()
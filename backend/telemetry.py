@@ -0,0 +1,120 @@
+import contextvars, logging, os, time, uuid
+from contextlib import contextmanager
+from typing import Dict
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+# Prometheus metrics for the pipeline, plus a per-request Trace that collects
+# the same stage timings for one document. stage() feeds both.
+#
+# With several workers (backend/serve.py) set PROMETHEUS_MULTIPROC_DIR to an
+# empty directory before starting, so /metrics aggregates every worker.
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+STAGE_SECONDS = Histogram("air_stage_seconds", "Time spent in each pipeline stage", ["stage"], buckets=STAGE_BUCKETS)
+SENTENCES = Counter("air_sentences_total", "Sentences entering and leaving each gate", ["gate", "outcome"])
+MATCHES_PER_DOCUMENT = Histogram("air_matches_per_document", "Accepted rule matches per document",
+                                 buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500))
+LLM_TOKENS = Counter("air_llm_tokens_total", "Ollama tokens, prompt (in) and generated (out)", ["direction"])
+LLM_RETRIES = Counter("air_llm_retries_total", "Ollama requests retried after an error or unparseable output")
+PARSE_STRATEGY = Counter("air_extract_json_total", "extract_json results by the strategy that parsed the output", ["strategy"])
+PARSE_ATTEMPTS = Counter("air_extract_json_attempts_total", "extract_json strategies tried, by whether they parsed the output",
+                         ["strategy", "outcome"])
+LLM_REREQUESTS = Counter("air_llm_rerequested_pairs_total", "Pairs a valid answer missed, mangled or contradicted (re-asked while retries remain)",
+                         ["reason"])
+DEDUP = Counter("air_dedup_total", "Items kept as unique or collapsed into an earlier (near) duplicate", ["stage", "kind"])
+COALESCED = Counter("air_coalesced_total", "Calls that ran the work (leader) or awaited an identical in-flight one (waiter)",
+                    ["level", "role"])
+JOBS = Counter("air_jobs_total", "Asynchronous jobs by outcome (queued, rejected with 429, done, failed)", ["outcome"])
+JOB_QUEUE_DEPTH = Gauge("air_job_queue_depth", "Jobs waiting for a worker", multiprocess_mode="livesum")
+ERRORS = Counter("air_errors_total", "Errors by pipeline stage and type", ["stage", "type"])
+
+_current_trace: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """Stage timings for one request, summed per stage (parallel LLM shards add up)."""
+
+    def __init__(self, trace_id: str | None = None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name: str, n: int) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def as_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "stages_ms": {name: round(s * 1000, 2) for name, s in self.stages.items()},
+            "counts": dict(self.counts),
+        }
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, so browser dev tools show the stage breakdown."""
+        return ", ".join(f"{name};dur={s * 1000:.1f}" for name, s in self.stages.items())
+
+
+def start_trace(trace_id: str | None = None) -> Trace:
+    trace = Trace(trace_id)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage into STAGE_SECONDS and the current trace; count its exceptions."""
+    t1 = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        ERRORS.labels(stage=name, type=type(e).__name__).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - t1
+        STAGE_SECONDS.labels(stage=name).observe(elapsed)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(name, elapsed)
+
+
+def count_gate(gate: str, kept: int, dropped: int) -> None:
+    SENTENCES.labels(gate=gate, outcome="in").inc(kept + dropped)
+    SENTENCES.labels(gate=gate, outcome="kept").inc(kept)
+    SENTENCES.labels(gate=gate, outcome="dropped").inc(dropped)
+
+
+def count_dedup(stage: str, unique: int, duplicates: int) -> None:
+    """Record how many items a dedup pass collapsed, in DEDUP and the current trace."""
+    DEDUP.labels(stage=stage, kind="unique").inc(unique)
+    DEDUP.labels(stage=stage, kind="duplicate").inc(duplicates)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.count(f"{stage}_unique", unique)
+        trace.count(f"{stage}_duplicates", duplicates)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def configure_logging(level: str = "WARNING") -> None:
+    """Log level for the pipeline's own loggers (backend.*); debug shows per-item detail."""
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger("backend").setLevel(level.upper())
@@ -0,0 +1,69 @@
+# Accuracy / latency of every available inference backend (backend/runtime.py)
+# for the Gate 2 classifier and the bge-small embedder on backend/text.txt.
+# torch-cpu is the reference: the classifier is compared on keep/drop decisions
+# and noise scores, the embedder on cosine similarity to the torch vectors.
+# ONNX backends need experimentation/export_onnx.py to have been run first.
+# Run from the project root: python experimentation/bench_backends.py
+
+import sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from backend.filter import GATE2_MODEL, RelevanceFilter
+from backend.matcher import EMBEDDER_NAME, legal_distill_batch
+from backend.runtime import BACKENDS, load_embedder, load_zero_shot, resolve_backend
+
+BATCH_SIZE = 16
+
+legal_filter = RelevanceFilter()
+raw_text = (ROOT / "backend" / "text.txt").read_text(encoding="utf-8")
+sentences = [s.text.strip()[:512] for s in legal_filter.nlp(raw_text).sents if len(s.text.strip()) >= 15]
+distilled = legal_distill_batch(sentences)
+print(f"{len(sentences)} sentences from text.txt, auto backend: {resolve_backend(GATE2_MODEL, 'auto')}\n")
+
+
+def noise_score(res):
+    return res["scores"][0] if res["labels"][0] == "irrelevant noise" else 1.0 - res["scores"][0]
+
+
+def timed(fn, repeat=3):
+    fn()  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        t1 = time.time()
+        out = fn()
+        best = min(best, time.time() - t1)
+    return out, best
+
+
+reference = {}
+for backend in BACKENDS:
+    try:
+        classifier = load_zero_shot(GATE2_MODEL, backend)
+        embedder = load_embedder(EMBEDDER_NAME, backend)
+    except Exception as e:
+        print(f"{backend:<11} unavailable: {e}")
+        continue
+
+    results, t_cls = timed(lambda: classifier(sentences, candidate_labels=RelevanceFilter.CANDIDATE_LABELS,
+                                              batch_size=BATCH_SIZE))
+    vectors, t_emb = timed(lambda: np.asarray(embedder.encode(distilled, batch_size=BATCH_SIZE,
+                                                              normalize_embeddings=True), dtype=np.float32))
+    scores = np.array([noise_score(r) for r in results])
+    dropped = scores > RelevanceFilter.NOISE_THRESHOLD
+
+    line = (f"{backend:<11} gate2 {len(sentences) / t_cls:>7.1f} sent/s   "
+            f"embed {len(distilled) / t_emb:>7.1f} sent/s")
+    if not reference:
+        reference = {"scores": scores, "dropped": dropped, "vectors": vectors}
+        line += "   (reference)"
+    else:
+        cosine = np.sum(vectors * reference["vectors"], axis=1)
+        line += (f"   same keep/drop {int(np.sum(dropped == reference['dropped']))}/{len(sentences)}"
+                 f"   max |Δnoise| {np.max(np.abs(scores - reference['scores'])):.4f}"
+                 f"   cosine to torch mean {cosine.mean():.4f} min {cosine.min():.4f}")
+    print(line)
@@ -0,0 +1,58 @@
+# Gate 1: the old `\b(?:term|term|...)\b` alternation regex vs the Aho-Corasick
+# KeywordMatcher, at the real ontology size and with synthetic terms added to
+# reach thousands. Also checks that both return the same hits.
+# Run from the project root: python experimentation/bench_gate1.py
+
+import random, re, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend.filter import RelevanceFilter  # models are lazy: nothing heavy loads here
+from backend.keywords import KeywordMatcher
+
+REPEAT = 200
+
+ontology = RelevanceFilter().ontology
+raw_text = (ROOT / "backend" / "text.txt").read_text(encoding="utf-8")
+sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", raw_text) if len(s.strip()) >= 15] * REPEAT
+
+
+def old_regex(keywords):
+    sorted_kws = sorted(keywords, key=len, reverse=True)
+    return re.compile(r'\b(?:' + '|'.join(map(re.escape, sorted_kws)) + r')\b', re.IGNORECASE)
+
+
+random.seed(0)
+base_terms = {kw.lower() for kws in ontology.values() for kw in kws}
+vocab = sorted({w.lower() for w in re.findall(r"[A-Za-z]{4,}", raw_text)})
+
+for target in (len(base_terms), 1000, 3000, 10000):
+    extended = {domain: list(kws) for domain, kws in ontology.items()}
+    terms = set(base_terms)
+    while len(terms) < target:
+        # Synthetic multi-word terms that never occur, so the hit set stays the same
+        term = f"{random.choice(vocab)} {random.choice(vocab)}x{len(terms)}"
+        terms.add(term)
+        extended[random.choice(list(extended))].append(term)
+
+    regex = old_regex(terms)
+    matcher = KeywordMatcher.from_ontology(extended)
+
+    t1 = time.time()
+    regex_hits = [[m.lower() for m in regex.findall(s)] for s in sentences]
+    t_regex = time.time() - t1
+
+    t1 = time.time()
+    ac_hits = [[h.term for h in matcher.find(s)] for s in sentences]
+    t_ac = time.time() - t1
+
+    agree = sum(a == b for a, b in zip(regex_hits, ac_hits))
+    print(f"{len(terms):>6} terms  regex {len(sentences) / t_regex:>9.0f} sent/s   "
+          f"aho-corasick {len(sentences) / t_ac:>9.0f} sent/s   identical hits {agree}/{len(sentences)}")
+
+shared = {t: d for t, d in KeywordMatcher.from_ontology(ontology).domains.items() if len(d) > 1}
+print(f"\nTerms in several domains (previously mapped to one): {len(shared)}")
+for term in ("store", "log", "withdraw", "notification", "period"):
+    print(f"  {term:<13} {shared.get(term)}")
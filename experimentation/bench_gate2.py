@@ -0,0 +1,52 @@
+# Gate 2 throughput: one classifier call per sentence (old behaviour) vs
+# length-bucketed batches (RelevanceFilter._classify_batch).
+# Run from the project root: python experimentation/bench_gate2.py
+
+import sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend.filter import RelevanceFilter
+
+REPEAT = 20  # text.txt is tiny, so tile it to get a ToS-sized sentence pool
+
+legal_filter = RelevanceFilter()
+raw_text = (ROOT / "backend" / "text.txt").read_text(encoding="utf-8")
+doc = legal_filter.nlp("\n\n".join([raw_text] * REPEAT))
+
+sentences = []
+for sent in doc.sents:
+    text = sent.text.strip()
+    if len(text) >= 15 and "means" not in text.lower() and legal_filter._keyword_gate(text)[0]:
+        # Suffix keeps every tiled copy distinct, so the memo/dedup cannot skew the timing
+        sentences.append(f"{text} (clause {len(sentences) + 1})")
+
+print(f"Gate 2 candidates: {len(sentences)}")
+
+# --- Before: per-sentence ---
+t1 = time.time()
+before = []
+for text in sentences:
+    res = legal_filter.classifier(text[:512], candidate_labels=RelevanceFilter.CANDIDATE_LABELS)
+    before.append(res['scores'][0] if res['labels'][0] == "irrelevant noise" and res['scores'][0] > RelevanceFilter.NOISE_THRESHOLD else None)
+t_before = time.time() - t1
+print(f"per-sentence : {t_before:.2f}s  ({len(sentences) / t_before:.1f} sentences/sec)")
+
+# --- After: batched ---
+for batch_size in (8, 16, 32):
+    legal_filter.batch_size = batch_size
+    legal_filter.classifier_cache.clear()  # measure the model, not the memo
+    t1 = time.time()
+    after = legal_filter._classify_batch(sentences)
+    t_after = time.time() - t1
+    same = sum((a is None) == (b is None) for a, b in zip(before, after))
+    print(f"batch={batch_size:<4}: {t_after:.2f}s  ({len(sentences) / t_after:.1f} sentences/sec)  "
+          f"speedup x{t_before / t_after:.1f}  same keep/drop decisions: {same}/{len(sentences)}")
+
+# --- Memoized: same sentences again ---
+t1 = time.time()
+legal_filter._classify_batch(sentences)
+t_memo = time.time() - t1
+print(f"memoized   : {t_memo:.4f}s  cache={legal_filter.classifier_cache.stats()}")
@@ -0,0 +1,43 @@
+# Rule retrieval: Chroma collection.query vs MatrixRetriever (one matmul per batch).
+# Needs the rule_index artifact: run experimentation/db_generator.py first.
+# Run from the project root: python experimentation/bench_retriever.py
+
+import sys, time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend.matcher import get_collection, get_embedder, legal_distill_batch, paths
+from backend.retriever import MatrixRetriever
+
+REPEAT = 20
+
+matrix = MatrixRetriever(paths["index_dir"])
+collection = get_collection()
+embedder_model = get_embedder()
+
+raw_text = (ROOT / "backend" / "text.txt").read_text(encoding="utf-8")
+sentences = [line.strip() for line in raw_text.splitlines() if len(line.strip()) > 15]
+queries = embedder_model.encode(legal_distill_batch(sentences), normalize_embeddings=True).astype(np.float32)
+
+for batch in (1, 16, 256):
+    q = np.resize(queries, (batch, queries.shape[1]))
+    q_list = q.tolist()
+
+    t1 = time.time()
+    for _ in range(REPEAT):
+        chroma_res = collection.query(query_embeddings=q_list, n_results=1)
+    t_chroma = (time.time() - t1) / REPEAT
+
+    t1 = time.time()
+    for _ in range(REPEAT):
+        matrix_res = matrix.query(q, n_results=1)
+    t_matrix = (time.time() - t1) / REPEAT
+
+    agree = sum(a[0] == b[0] for a, b in zip(chroma_res["ids"], matrix_res["ids"]))
+    max_gap = max(abs(a[0] - b[0]) for a, b in zip(chroma_res["distances"], matrix_res["distances"]))
+    print(f"batch={batch:<4} chroma={t_chroma * 1000:.2f}ms  matrix={t_matrix * 1000:.2f}ms  "
+          f"speedup x{t_chroma / t_matrix:.1f}  top-1 agreement {agree}/{batch}  max distance gap {max_gap:.4f}")
@@ -0,0 +1,50 @@
+# Segmentation engines on backend/text.txt: speed and boundary agreement.
+# The dependency parser is the reference; agreement is precision/recall/F1 of
+# sentence-start character offsets against it.
+# Run from the project root: python experimentation/bench_segmentation.py
+
+import sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend.segmentation import SEGMENTERS, load_pipeline
+
+REPEAT = 50  # tile text.txt so timings are measurable
+
+raw_text = (ROOT / "backend" / "text.txt").read_text(encoding="utf-8")
+bench_text = "\n\n".join([raw_text] * REPEAT)
+
+
+def boundaries(doc) -> set[int]:
+    return {sent.start_char for sent in doc.sents if sent.text.strip()}
+
+
+reference = None
+for name in SEGMENTERS:
+    nlp = load_pipeline(name)
+    nlp(raw_text)  # warm up
+
+    t1 = time.time()
+    nlp(bench_text)
+    elapsed = time.time() - t1
+
+    found = boundaries(nlp(raw_text))
+    if reference is None:
+        reference = found
+
+    hits = len(found & reference)
+    precision = hits / len(found) if found else 0.0
+    recall = hits / len(reference) if reference else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    print(f"{name:<12} {elapsed:.3f}s  ({len(bench_text) / elapsed / 1000:.0f}k chars/sec)  "
+          f"sentences={len(found)}  P={precision:.2f} R={recall:.2f} F1={f1:.2f}")
+
+# Spot check on legal references and clause numbering
+sample = "1. Sec. 43A applies. If a transfer occurs, Section 3(v) of these Terms shall apply.\n(a) We may share data e.g. with vendors."
+for name in SEGMENTERS:
+    print(f"\n[{name}]")
+    for sent in load_pipeline(name)(sample).sents:
+        print(f"  | {sent.text.strip()}")
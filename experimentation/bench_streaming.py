@@ -0,0 +1,49 @@
+# Peak memory and time of whole-document segmentation vs the windowed stream
+# (RelevanceFilter.iter_document) on synthetic policies up to several MB.
+# Each measurement runs in a fresh process so peak RSS is not shared.
+# Run from the project root: python experimentation/bench_streaming.py
+
+import multiprocessing as mp
+import resource, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+SIZES = (250_000, 1_000_000, 4_000_000)
+
+
+def measure(mode: str, size: int, out) -> None:
+    from backend.filter import RelevanceFilter
+    from experimentation.benchmarks.corpus import build_corpus
+
+    legal_filter = RelevanceFilter()
+    legal_filter.nlp("Warm up.")
+    text = build_corpus(size)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    t1 = time.time()
+    try:
+        if mode == "whole":
+            # The old path: one Doc for the whole text (max_length raised, else >1M chars just fails)
+            legal_filter.nlp.max_length = len(text) + 1
+            count = len(legal_filter.gate_sentences([list(legal_filter.nlp(text).sents)])[0])
+        else:
+            count = sum(1 for _ in legal_filter.iter_document(text))
+        status = f"{count} chunks"
+    except Exception as e:
+        status = f"failed: {type(e).__name__}"
+    elapsed = time.time() - t1
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024
+    out.put(f"{mode:<7} {size / 1e6:>5.2f}M chars  {elapsed:>7.1f}s  peak +{peak:>7.0f} MB  {status}")
+
+
+if __name__ == "__main__":
+    ctx = mp.get_context("fork")
+    for size in SIZES:
+        for mode in ("whole", "stream"):
+            out = ctx.Queue()
+            proc = ctx.Process(target=measure, args=(mode, size, out))
+            proc.start()
+            proc.join()
+            print(out.get() if not out.empty() else f"{mode:<7} {size / 1e6:>5.2f}M chars  crashed (exit {proc.exitcode})")
@@ -0,0 +1,82 @@
+# Per-worker memory of the preload-then-fork server (backend/serve.py).
+# For 1, 4 and 8 workers: start the server, wait for /readyz, push a few
+# /analyze requests through so workers touch their code paths, then read each
+# worker's smaps_rollup. USS (private pages) is what a worker really costs;
+# PSS splits the shared model pages between the processes that map them.
+# Linux only. Run from the project root: python experimentation/bench_workers.py
+
+import json, subprocess, sys, time
+import urllib.error, urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PORT = 8765
+WORKER_COUNTS = (1, 4, 8)
+REQUESTS = 8
+
+
+def smaps(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[-1] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return fields
+
+
+def children(pid: int) -> list[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def get(path: str) -> int:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{PORT}{path}", timeout=5) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def post_analyze(text: str) -> None:
+    req = urllib.request.Request(
+        f"http://127.0.0.1:{PORT}/analyze",
+        data=json.dumps({"text": text}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        urllib.request.urlopen(req, timeout=300).read()
+    except OSError:
+        pass  # Ollama may be absent; the local stages still ran
+
+
+mb = lambda b: f"{b / 2**20:8.1f} MB"
+sample = (ROOT / "backend" / "text.txt").read_text(encoding="utf-8")
+
+for n in WORKER_COUNTS:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "backend.serve", "--workers", str(n), "--port", str(PORT), "--log-level", "warning"],
+        cwd=ROOT,
+    )
+    try:
+        while get("/readyz") != 200:
+            if proc.poll() is not None:
+                sys.exit("server exited before becoming ready")
+            time.sleep(1)
+        for i in range(REQUESTS):
+            post_analyze(f"{sample}\n(request {i})")
+
+        master = smaps(proc.pid)
+        workers = [smaps(pid) for pid in children(proc.pid)]
+        uss = [w.get("Private_Clean", 0) + w.get("Private_Dirty", 0) for w in workers]
+        print(f"\n--- {n} worker(s) ---")
+        print(f"master  RSS {mb(master['Rss'])}  PSS {mb(master['Pss'])}")
+        for pid_uss, w in zip(uss, workers):
+            print(f"worker  RSS {mb(w['Rss'])}  PSS {mb(w['Pss'])}  USS {mb(pid_uss)}")
+        total_pss = master["Pss"] + sum(w["Pss"] for w in workers)
+        print(f"mean worker USS {mb(sum(uss) / len(uss))}   total PSS {mb(total_pss)}")
+    finally:
+        proc.terminate()
+        proc.wait()
@@ -0,0 +1,2 @@
+# Per-stage micro-benchmarks over synthetic policies of increasing size.
+# Run from the project root: python -m experimentation.benchmarks --help
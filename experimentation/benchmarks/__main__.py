@@ -0,0 +1,118 @@
+import argparse, json, platform, subprocess, sys, time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from experimentation.benchmarks.corpus import ROOT, SIZES, build_corpus, load_sources
+
+# Usage (from the project root):
+#   python -m experimentation.benchmarks --out bench.json
+#   python -m experimentation.benchmarks --sizes 1000 10000 --stages gate1 retrieval
+#   python -m experimentation.benchmarks --compare bench_main.json   # flags p50 regressions
+
+
+def percentile(samples: List[float], q: float) -> float:
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_stage(run, unit: str, fixture: Dict[str, Any], repeat: int, warmup: int) -> Dict[str, Any]:
+    from experimentation.benchmarks.stages import items_for
+
+    for _ in range(warmup):
+        run()
+    samples, items = [], 0
+    for _ in range(repeat):
+        t1 = time.perf_counter()
+        counted = run()
+        samples.append(time.perf_counter() - t1)
+        items = items_for(unit, fixture, counted)
+
+    p50 = percentile(samples, 50)
+    return {
+        "unit": unit,
+        "items": items,
+        "repeat": repeat,
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "min_ms": round(min(samples) * 1000, 3),
+        "throughput_per_s": round(items / p50, 1) if p50 > 0 else None,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Lines for every (size, stage) whose p50 got slower than baseline by more than tolerance."""
+    lines = []
+    for size, stages in report["results"].items():
+        for stage, now in stages.items():
+            before = baseline.get("results", {}).get(size, {}).get(stage)
+            if not before or not before.get("p50_ms"):
+                continue
+            ratio = now["p50_ms"] / before["p50_ms"]
+            if ratio > 1 + tolerance:
+                lines.append(f"REGRESSION {stage} @ {size} chars: p50 {before['p50_ms']}ms -> {now['p50_ms']}ms (x{ratio:.2f})")
+    return lines
+
+
+def main() -> None:
+    from experimentation.benchmarks.stages import STAGES, prepare
+
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on synthetic policies and report p50/p95 as JSON.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="corpus sizes in characters")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", type=Path, help="baseline report to check p50 regressions against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p50 slowdown vs baseline")
+    args = parser.parse_args()
+
+    sources = load_sources()
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seed": args.seed,
+        "results": {},
+    }
+
+    for size in args.sizes:
+        text = build_corpus(size, args.seed, sources)
+        t1 = time.time()
+        fixture = prepare(text)
+        print(f"[{size} chars] {len(fixture['sentences'])} sentences, {len(fixture['candidates'])} Gate 1 candidates, "
+              f"{len(fixture['law_pairs'])} pairs (setup {time.time() - t1:.1f}s)", file=sys.stderr)
+
+        results = {}
+        for name in args.stages:
+            unit, setup = STAGES[name]
+            results[name] = bench_stage(setup(fixture), unit, fixture, args.repeat, args.warmup)
+            print(f"  {name:<16} p50 {results[name]['p50_ms']:>10.2f}ms  p95 {results[name]['p95_ms']:>10.2f}ms", file=sys.stderr)
+        report["results"][str(size)] = results
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text(encoding="utf-8")), args.tolerance)
+        for line in regressions:
+            print(line, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
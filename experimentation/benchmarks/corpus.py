@@ -0,0 +1,73 @@
+import json, random, re
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+# Sentences that should fail Gate 1 or be labelled noise by Gate 2, so the
+# corpus has a realistic share of boilerplate around the legal clauses
+FILLER = [
+    "Welcome to our service and thank you for choosing us.",
+    "These pages were last updated at the start of the year.",
+    "Our team is passionate about building great experiences for everyone.",
+    "You can reach the help centre from the menu at the top of every page.",
+    "Headings are for convenience only and have no legal effect.",
+    "We love hearing from our community of users around the world.",
+]
+
+# How a rule's rationale is turned into a clause that may violate it
+TEMPLATES = [
+    "We {neg} comply with the following: {text}",
+    "The Company {neg} ensure that it {text_lower}",
+    "Notwithstanding anything to the contrary, we {neg} guarantee this: {text}",
+    "Users acknowledge that the platform {neg} honour this obligation: {text}",
+]
+
+
+def load_sources() -> dict:
+    text = (ROOT / "backend" / "text.txt").read_text(encoding="utf-8")
+    with (ROOT / "backend" / "database" / "db.json").open("r", encoding="utf-8") as f:
+        rules = json.load(f)
+    rationales = [re.sub(r"\s*\[cite:[^\]]*\]", "", r.get("rationale", "")).strip() for r in rules]
+    tos = [line.strip() for line in text.splitlines() if len(line.strip()) >= 15]  # one clause per line
+    return {"tos": tos, "laws": [r for r in rationales if r], "raw_laws": [r["raw_law"] for r in rules]}
+
+
+def build_corpus(size: int, seed: int = 0, sources: dict | None = None) -> str:
+    """
+    A synthetic Terms of Service of about `size` characters: numbered sections of
+    paragraphs mixing the sample clauses in text.txt, clauses written from the
+    db.json rule rationales, and filler. Same (size, seed) -> same text.
+    """
+    sources = sources or load_sources()
+    rng = random.Random(f"{seed}:{size}")
+    parts: List[str] = []
+    length = 0
+    section = 1
+
+    while length < size:
+        paragraph = []
+        for _ in range(rng.randint(2, 5)):
+            roll = rng.random()
+            if roll < 0.35:
+                sentence = rng.choice(sources["tos"])
+            elif roll < 0.75:
+                text = rng.choice(sources["laws"]).rstrip(".")
+                sentence = rng.choice(TEMPLATES).format(
+                    neg=rng.choice(["will", "will not", "may", "shall not"]), text=text + ".",
+                    text_lower=text[:1].lower() + text[1:] + ".",
+                )
+            else:
+                sentence = rng.choice(FILLER)
+            paragraph.append(sentence)
+        block = f"Section {section}.\n{' '.join(paragraph)}\n\n"
+        parts.append(block)
+        length += len(block)
+        section += 1
+
+    corpus = "".join(parts)
+    # Cut back to the last paragraph break within the budget (keep at least one paragraph)
+    cut = corpus.rfind("\n\n", 0, size)
+    return corpus[:cut] if cut > 0 else corpus
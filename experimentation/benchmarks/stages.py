@@ -0,0 +1,130 @@
+import json
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+from backend.api import build_response, legal_filter
+from backend.inference import extract_json, generate_prompt
+from backend.matcher import get_embedder, legal_distill_batch, process_matches, query_rules
+
+# name -> (unit counted for throughput, setup(fixture) -> run() -> items processed).
+# setup is untimed and runs once per corpus; run() is what gets timed. Each
+# stage reads the previous stages' outputs from the fixture, so every stage is
+# measured in isolation on realistic input.
+Stage = Tuple[str, Callable[[Dict[str, Any]], Callable[[], int]]]
+
+
+def prepare(text: str) -> Dict[str, Any]:
+    """Run the pipeline once over text and keep each stage's input."""
+    nlp = legal_filter.nlp
+    nlp.max_length = max(nlp.max_length, len(text) + 1)
+    sentences = [s.text.strip() for s in nlp(text).sents if len(s.text.strip()) >= 15]
+
+    candidates, domains = [], []
+    for sentence in sentences:
+        hits, found = legal_filter._keyword_gate(sentence)
+        if hits:
+            candidates.append(sentence)
+            domains.append(found)
+
+    distilled = legal_distill_batch(candidates)
+    embedder = get_embedder()
+    embeddings = (embedder.encode(distilled, normalize_embeddings=True) if distilled
+                  else np.zeros((0, embedder.get_sentence_embedding_dimension()), dtype=np.float32))
+    results = query_rules(embeddings, n_results=1, domains=domains) if len(candidates) else None
+    # Every sentence paired with its nearest rule: the upper bound the prompt and parser see
+    law_pairs = process_matches(results, candidates, threshold=2.0) if results else []
+    llm_output = "```json\n" + json.dumps({
+        "analysis": [
+            {"id": i + 1, "violated": i % 3 == 0, "irrelevant": i % 3 == 1, "reason": "Synthetic verdict for benchmarking."}
+            for i in range(len(law_pairs))
+        ],
+        "summary": "Synthetic summary.",
+    }, indent=2) + "\n```"
+
+    return {
+        "text": text, "sentences": sentences, "candidates": candidates, "domains": domains,
+        "distilled": distilled, "embeddings": embeddings, "results": results,
+        "law_pairs": law_pairs, "llm_output": llm_output, "parsed": extract_json(llm_output),
+    }
+
+
+def _segmentation(f):
+    nlp = legal_filter.nlp
+    return lambda: sum(1 for _ in nlp(f["text"]).sents)
+
+
+def _gate1(f):
+    def run():
+        for sentence in f["sentences"]:
+            legal_filter._keyword_gate(sentence)
+        return len(f["sentences"])
+    return run
+
+
+def _gate2(f):
+    def run():
+        legal_filter.classifier_cache.clear()  # time the model, not the memo
+        legal_filter._classify_batch(f["candidates"])
+        return len(f["candidates"])
+    return run
+
+
+def _distill(f):
+    return lambda: len(legal_distill_batch(f["candidates"]))
+
+
+def _embedding(f):
+    embedder = get_embedder()  # the model itself, bypassing the embedding memo
+    return lambda: len(embedder.encode(f["distilled"], normalize_embeddings=True)) if f["distilled"] else 0
+
+
+def _retrieval(f):
+    return lambda: len(query_rules(f["embeddings"], n_results=1, domains=f["domains"])["ids"]) if f["candidates"] else 0
+
+
+def _process_matches(f):
+    def run():
+        if f["results"] is not None:
+            process_matches(f["results"], f["candidates"], threshold=0.40)
+        return len(f["candidates"])
+    return run
+
+
+def _prompt(f):
+    def run():
+        generate_prompt(f["law_pairs"])
+        return len(f["law_pairs"])
+    return run
+
+
+def _extract_json(f):
+    def run():
+        extract_json(f["llm_output"])
+        return len(f["law_pairs"])
+    return run
+
+
+def _build_response(f):
+    def run():
+        build_response(f["law_pairs"], f["parsed"] or {})
+        return len(f["law_pairs"])
+    return run
+
+
+STAGES: Dict[str, Stage] = {
+    "segmentation": ("chars", _segmentation),
+    "gate1": ("sentences", _gate1),
+    "gate2": ("sentences", _gate2),
+    "legal_distill": ("sentences", _distill),
+    "embedding": ("sentences", _embedding),
+    "retrieval": ("sentences", _retrieval),
+    "process_matches": ("sentences", _process_matches),
+    "generate_prompt": ("pairs", _prompt),
+    "extract_json": ("pairs", _extract_json),
+    "build_response": ("pairs", _build_response),
+}
+
+
+def items_for(unit: str, fixture: Dict[str, Any], counted: int) -> int:
+    return len(fixture["text"]) if unit == "chars" else counted
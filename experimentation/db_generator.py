@@ -3,6 +3,7 @@ from pathlib import Path
 from typing import List, Dict, Any
 
 import chromadb
+import numpy as np
 from sentence_transformers import SentenceTransformer
 import re
 
@@ -42,7 +43,8 @@ def project_paths() -> Dict[str, Path]:
     root = here.parent.parent  # AttorneysInRAGs/
     db_json = root / "backend" / "database" / "db.json"
     chroma_dir = root / "backend" / "database" / "chroma_db"
-    return {"root": root, "db_json": db_json, "chroma_dir": chroma_dir}
+    index_dir = root / "backend" / "database" / "rule_index"
+    return {"root": root, "db_json": db_json, "chroma_dir": chroma_dir, "index_dir": index_dir}
 
 
 def load_rules(db_json: Path) -> List[Dict[str, Any]]:
@@ -78,6 +80,16 @@ def build_embeddings(model: SentenceTransformer, texts: List[str]) -> List[List[
     return model.encode(texts, normalize_embeddings=True).tolist()
 
 
+def write_matrix_index(index_dir: Path, ids: List[str], documents: List[str],
+                       metadatas: List[Dict[str, Any]], embeddings: List[List[float]]) -> None:
+    """Write the rule matrix + metadata read by backend.retriever.MatrixRetriever."""
+    index_dir.mkdir(parents=True, exist_ok=True)
+    # Contiguous float32 so the backend can np.load(..., mmap_mode="r") it
+    np.save(index_dir / "embeddings.npy", np.ascontiguousarray(embeddings, dtype=np.float32))
+    with (index_dir / "rules.json").open("w", encoding="utf-8") as f:
+        json.dump({"ids": ids, "documents": documents, "metadatas": metadatas}, f, ensure_ascii=False, indent=2)
+
+
 def main() -> None:
     paths = project_paths()
 
@@ -121,14 +133,18 @@ def main() -> None:
         else:
             domain_str = str(domain_val) if domain_val is not None else ""
 
-        metadatas.append(
-            {
-                "rule_id": str(rule_id),
-                "domain": domain_str,
-                "raw_law": row.get("raw_law", ""),
-                "severity": row.get("severity", ""),
-            }
-        )
+        metadata = {
+            "rule_id": str(rule_id),
+            "domain": domain_str,
+            "raw_law": row.get("raw_law", ""),
+            "severity": row.get("severity", ""),
+        }
+        # One boolean flag per domain ("in_DATA_SHARING": True) so the matcher can
+        # filter a query to a domain partition; Chroma can't match inside domain_str.
+        for domain in domain_str.split(","):
+            if domain.strip():
+                metadata[f"in_{domain.strip().upper()}"] = True
+        metadatas.append(metadata)
 
     # Decide embeddings approach: local SentenceTransformer (384-dim)
     # This aligns with Gemini guidance and runs fully offline.
@@ -150,6 +166,10 @@ def main() -> None:
 
     print(f"Inserted {len(ids)} rules into Chroma collection 'policies'.")
 
+    # Same rules as a memory-mappable matrix for the in-process retriever
+    write_matrix_index(paths["index_dir"], ids, documents, metadatas, embeddings)
+    print(f"Wrote rule matrix index to {paths['index_dir']}.")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,76 @@
+# Export the Gate 2 classifier and the bge-small embedder to ONNX, plus a
+# dynamically quantized int8 copy of each, for the onnx / onnx-int8 backends in
+# backend/runtime.py. Needs torch, transformers and the `onnx` package (used by
+# onnxruntime's quantizer).
+# Run from the project root: python experimentation/export_onnx.py
+
+import json, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+
+from backend.filter import GATE2_MODEL
+from backend.matcher import EMBEDDER_NAME
+from backend.runtime import ONNX_FILES, SOURCE_FILE, onnx_export_dir
+
+OPSET = 17
+
+
+class LastHidden(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                          token_type_ids=token_type_ids).last_hidden_state
+
+
+class Logits(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def export(model_name: str, module: torch.nn.Module, model, input_names, output_name: str, pair: bool = False) -> None:
+    out_dir = onnx_export_dir(model_name)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(out_dir)
+    model.config.save_pretrained(out_dir)
+    (out_dir / SOURCE_FILE).write_text(
+        json.dumps({"model": model_name, "commit": getattr(model.config, "_commit_hash", None)}), encoding="utf-8"
+    )
+
+    # NLI models take (premise, hypothesis) pairs, the embedder single sentences
+    text = ["We may share your data with third parties."]
+    sample = tokenizer(text, ["This example is legal clause."] if pair else None, return_tensors="pt")
+    args = tuple(sample[name] for name in input_names)
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic[output_name] = {0: "batch"}
+
+    fp32_path = out_dir / ONNX_FILES["onnx"]
+    int8_path = out_dir / ONNX_FILES["onnx-int8"]
+    t1 = time.time()
+    module.eval()
+    with torch.no_grad():
+        torch.onnx.export(module, args, str(fp32_path), input_names=list(input_names), output_names=[output_name],
+                          dynamic_axes=dynamic, opset_version=OPSET, dynamo=False)
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    print(f"{model_name}: {fp32_path.stat().st_size / 1e6:.0f} MB fp32, "
+          f"{int8_path.stat().st_size / 1e6:.0f} MB int8 in {time.time() - t1:.1f}s -> {out_dir}")
+
+
+embedder = AutoModel.from_pretrained(EMBEDDER_NAME)
+export(EMBEDDER_NAME, LastHidden(embedder), embedder, ("input_ids", "attention_mask", "token_type_ids"), "last_hidden_state")
+
+classifier = AutoModelForSequenceClassification.from_pretrained(GATE2_MODEL)
+export(GATE2_MODEL, Logits(classifier), classifier, ("input_ids", "attention_mask"), "logits", pair=True)
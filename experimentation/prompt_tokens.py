@@ -0,0 +1,125 @@
+# Prompt size of the old format (full SYSTEM_PROMPT + every pair with its full
+# law text, per shard, pairs in document order) vs the compact one (pairs
+# grouped by law, law texts listed once per shard, SYSTEM_PROMPT in Ollama's
+# "system" field), and a check that every id in the compact prompts still
+# maps back to the same accepted_matches entry.
+#
+# Pairs come from the real filter + matcher over text.txt when the models are
+# installed, else from a synthetic skewed sample of db.json rules.
+# Token counts are chars/4 estimates; pass --ollama to have Ollama count them
+# (one tiny generation per prompt).
+# Run from the project root: python experimentation/prompt_tokens.py [--ollama]
+
+import argparse, json, random, re, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend.inference import (BATCH_SIZE, MODEL, OLLAMA_URL, SYSTEM_PROMPT, generate_prompt, get_client,
+                               merge_shard_results, order_by_law, shard_pairs)
+
+
+def legacy_prompt(law_pairs: list[dict]) -> str:
+    """The old per-call prompt: system prompt inlined, full law text repeated for every pair."""
+    pairs_str = "INPUT:\n"
+    for i, pair in enumerate(law_pairs):
+        pairs_str += f"id: {i+1}\nTOS_text: {pair['TOS_text']}\nMatched_law: {pair['raw_law']}\n\n"
+    return SYSTEM_PROMPT + pairs_str + "\nRemember: Output ONLY valid JSON."
+
+
+def load_pairs() -> tuple[list[dict], str]:
+    try:
+        from backend.filter import RelevanceFilter
+        from backend.matcher import find_violations
+
+        text = (ROOT / "backend" / "text.txt").read_text(encoding="utf-8")
+        return find_violations(RelevanceFilter().process_document(text)), "text.txt through the pipeline"
+    except ImportError:
+        pass
+
+    from experimentation.benchmarks.corpus import build_corpus
+
+    rules = json.loads((ROOT / "backend" / "database" / "db.json").read_text(encoding="utf-8"))
+    sentences = [" ".join(s.split()) for s in re.split(r"(?<=[.!?])\s+", build_corpus(20_000)) if len(s) >= 40]
+    rng = random.Random(0)
+    # A few statutes attract most matches, as IT_ACT sections do in practice
+    popular = rng.sample(rules, 6)
+    pairs = []
+    for sentence in sentences[:48]:
+        rule = rng.choice(popular) if rng.random() < 0.7 else rng.choice(rules)
+        pairs.append({"TOS_text": sentence, "rule_id": rule["rule_id"], "raw_law": rule["raw_law"],
+                      "domain": rule["domain"], "severity": rule["severity"]})
+    return pairs, "synthetic sample (pipeline models not installed)"
+
+
+def ollama_tokens(system: str | None, prompt: str) -> int:
+    payload = {"model": MODEL, "prompt": prompt, "stream": False, "options": {"num_predict": 1}}
+    if system is not None:
+        payload["system"] = system
+    response = get_client().post(OLLAMA_URL, json=payload, timeout=300)
+    response.raise_for_status()
+    return response.json().get("prompt_eval_count") or 0
+
+
+def check_mapping(law_pairs: list[dict], order: list[int]) -> int:
+    """
+    Parse every compact shard prompt (pairs in `order`, as sent) back, then map
+    synthetic verdicts to accepted_matches the way adopt_verdicts does;
+    returns the number of mismatches.
+    """
+    errors = 0
+    sent = [law_pairs[i] for i in order]
+    shard_results = []
+    for offset, shard in shard_pairs(sent, BATCH_SIZE):
+        prompt = generate_prompt(shard)
+        laws = dict(re.findall(r"^\[([^\]]+)\] (.*)$", prompt, re.MULTILINE))
+        for local_id, label, tos_text in re.findall(r"^id: (\d+) \| law: (\S+)\nTOS_text: (.*)$", prompt, re.MULTILINE):
+            pair = sent[offset + int(local_id) - 1]
+            if (tos_text, laws.get(label)) != (pair["TOS_text"], pair["raw_law"]):
+                print(f"MISMATCH shard @{offset} id {local_id}: law {label}")
+                errors += 1
+        # What the LLM would answer, echoing each pair's text so the join can be checked
+        analysis = [{"id": i + 1, "violated": True, "irrelevant": False, "reason": p["TOS_text"]} for i, p in enumerate(shard)]
+        shard_results.append((offset, len(shard), {"analysis": analysis, "summary": ""}))
+
+    merged = merge_shard_results(shard_results)
+    for item in merged["analysis"]:
+        match = law_pairs[order[item["id"] - 1]]
+        if match["TOS_text"] != item["reason"]:
+            print(f"MISMATCH verdict id {item['id']}")
+            errors += 1
+    if len(merged["analysis"]) != len(law_pairs):
+        print(f"MISMATCH {len(merged['analysis'])} verdicts for {len(law_pairs)} matches")
+        errors += 1
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ollama", action="store_true", help="count tokens with Ollama instead of estimating")
+    args = parser.parse_args()
+
+    law_pairs, source = load_pairs()
+    shards = shard_pairs(law_pairs, BATCH_SIZE)
+    # What split_cached sends: every pair a miss, regrouped by law
+    order = order_by_law(law_pairs, list(range(len(law_pairs))))
+    grouped = shard_pairs([law_pairs[i] for i in order], BATCH_SIZE)
+    print(f"{len(law_pairs)} pairs, {len({p['rule_id'] for p in law_pairs})} distinct rules, {len(shards)} shards ({source})")
+
+    if args.ollama:
+        count = ollama_tokens
+    else:
+        count = lambda system, prompt: (len(system or "") + len(prompt)) // 4
+
+    before = sum(count(None, legacy_prompt(shard)) for _, shard in shards)
+    after = sum(count(None, generate_prompt(shard)) for _, shard in grouped)
+    system = count(None, SYSTEM_PROMPT)
+    print(f"before: {before:>7} prompt tokens  (SYSTEM_PROMPT + full law per pair, every call)")
+    print(f"after:  {after + system * len(shards):>7} prompt tokens sent  (law once per shard, SYSTEM_PROMPT in 'system')")
+    print(f"        {after + system:>7} evaluated when the system prefix is reused across calls")
+    print(f"saving: {1 - (after + system * len(shards)) / before:.0%} sent, {1 - (after + system) / before:.0%} evaluated")
+
+    errors = check_mapping(law_pairs, order)
+    print("id -> accepted_matches mapping: " + ("unchanged" if not errors else f"{errors} mismatches"))
+    sys.exit(1 if errors else 0)
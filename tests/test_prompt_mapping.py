@@ -0,0 +1,91 @@
+# Every verdict id must map back to the accepted_matches entry it was asked
+# about: pairs regrouped by law (split_cached / order_by_law), sharded, sent
+# in the compact LAWS/PAIRS prompt, answered, merged and adopted.
+# Run from the project root: python -m pytest tests
+
+import re
+
+import pytest
+
+import backend.inference as inference
+from backend.cache import VerdictCache
+from backend.inference import adopt_verdicts, generate_prompt, merge_shard_results, shard_pairs, split_cached
+
+LAWS = {
+    "IT_ACT_43A": "A body corporate handling sensitive personal data shall maintain reasonable security practices.",
+    "DPDP_8_7": "A Data Fiduciary shall erase personal data once the specified purpose is no longer served.",
+    "DPDP_6_4": "A Data Principal may withdraw consent at any time, with the ease with which it was given.",
+}
+
+
+def make_pairs() -> list[dict]:
+    # Laws interleaved in document order, plus a second text under an existing
+    # rule_id, which generate_prompt must label apart
+    rules = ["IT_ACT_43A", "DPDP_8_7", "IT_ACT_43A", "DPDP_6_4", "DPDP_8_7", "IT_ACT_43A", "DPDP_6_4", "DPDP_8_7"]
+    pairs = [{"TOS_text": f"Clause {i}: we may keep and share your data.", "rule_id": rule, "raw_law": LAWS[rule]}
+             for i, rule in enumerate(rules)]
+    pairs.append({"TOS_text": "Clause 8: we store passwords in plain text.", "rule_id": "IT_ACT_43A",
+                  "raw_law": "Reasonable security practices include ISO 27001 or an approved code."})
+    return pairs
+
+
+def parse_prompt(prompt: str) -> list[tuple[int, str, str]]:
+    """(id, law text, TOS_text) for every pair listed in a compact prompt."""
+    laws = dict(re.findall(r"^\[([^\]]+)\] (.*)$", prompt, re.MULTILINE))
+    return [(int(local_id), laws[label], tos_text)
+            for local_id, label, tos_text in re.findall(r"^id: (\d+) \| law: (\S+)\nTOS_text: (.*)$", prompt, re.MULTILINE)]
+
+
+def answer(shard: list[dict]) -> dict:
+    """What the LLM would answer, echoing each pair so the join can be checked."""
+    return {"analysis": [{"id": i + 1, "violated": i % 2 == 0, "irrelevant": False, "reason": f"{p['TOS_text']} | {p['raw_law']}"}
+                         for i, p in enumerate(shard)], "summary": ""}
+
+
+@pytest.fixture
+def verdicts(tmp_path, monkeypatch):
+    cache = VerdictCache(tmp_path / "verdicts.sqlite3")
+    monkeypatch.setattr(inference, "verdict_cache", cache)
+    return cache
+
+
+def test_ids_map_back_to_their_match(verdicts):
+    law_pairs = make_pairs()
+    cached, misses = split_cached(law_pairs)
+    assert cached == []
+    assert sorted(misses) == list(range(len(law_pairs)))
+    # Grouped by law: each raw_law's pairs are adjacent
+    laws_sent = [law_pairs[i]["raw_law"] for i in misses]
+    assert [law for k, law in enumerate(laws_sent) if k == 0 or law != laws_sent[k - 1]] == list(dict.fromkeys(laws_sent))
+
+    sent = [law_pairs[i] for i in misses]
+    shard_results = []
+    for offset, shard in shard_pairs(sent, 3):
+        listed = parse_prompt(generate_prompt(shard))
+        assert [local_id for local_id, _, _ in listed] == list(range(1, len(shard) + 1))
+        for local_id, law, tos_text in listed:
+            pair = sent[offset + local_id - 1]
+            assert (tos_text, law) == (pair["TOS_text"], pair["raw_law"])
+        shard_results.append((offset, len(shard), answer(shard)))
+
+    merged = merge_shard_results(shard_results)
+    adopted = adopt_verdicts(law_pairs, misses, merged["analysis"])
+    assert sorted(item["id"] for item in adopted) == list(range(1, len(law_pairs) + 1))
+    for item in adopted:
+        pair = law_pairs[item["id"] - 1]
+        assert item["reason"] == f"{pair['TOS_text']} | {pair['raw_law']}"
+
+
+def test_cached_verdicts_keep_their_match(verdicts):
+    law_pairs = make_pairs()
+    _, misses = split_cached(law_pairs)
+    adopt_verdicts(law_pairs, misses, answer([law_pairs[i] for i in misses])["analysis"])
+
+    # A second run of the same pairs in another order is served from the cache
+    reordered = law_pairs[::-1]
+    cached, misses = split_cached(reordered)
+    assert misses == []
+    assert sorted(item["id"] for item in cached) == list(range(1, len(reordered) + 1))
+    for item in cached:
+        pair = reordered[item["id"] - 1]
+        assert item["reason"] == f"{pair['TOS_text']} | {pair['raw_law']}"